@@ -0,0 +1,235 @@
+"""
+File containing an asynchronous engine that validates entries using the same validation steps as
+checker.py, but overlaps all API requests on a single thread using asyncio
+"""
+
+import threading
+from collections import deque
+from itertools import islice
+from urllib.error import HTTPError
+
+import checker
+from cache import google_cache, normalize_key
+from checker import GEOREGISTER, known_georegister_response, over_query_limit, parse_georegister_response, \
+    parse_google_response, validate_entry_lookups
+from ratelimit import google_limiter
+from transport import network
+from util import lazy_import
+
+# Asyncio is only imported when the asynchronous engine is used
+asyncio = lazy_import("asyncio")
+
+# The maximum number of simultaneous requests per endpoint
+GEOREGISTER_CONNECTIONS = 16
+GOOGLE_CONNECTIONS = 8
+# The maximum number of entries that are validated at the same time. Further entries are only
+# started when the first entry in line is done, so no work is queued up for the whole input
+ENTRIES_IN_FLIGHT = 64
+
+
+class AsyncLookupEngine:
+    """
+    Performs the lookups that are requested by the validation steps in checker.py asynchronously,
+    with a separate limit on the number of simultaneous requests for each endpoint.
+    """
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self.georegister = network.async_client(GEOREGISTER_CONNECTIONS)
+        self.google = network.async_client(GOOGLE_CONNECTIONS)
+
+    async def query_dutch_georegister(self, street, house_number, postal_code, city,
+                                      house_number_extra=None):
+        """
+        Asynchronous version of checker.query_dutch_georegister.
+
+        Parameters
+        ----------
+        street
+            The address street
+        house_number
+            The address house number
+        postal_code
+            The address postal code
+        city
+            The address city
+        house_number_extra
+            The extra part of the address house number
+
+        Returns
+        -------
+        dict
+            A dict containing the georegister response if a valid response was received
+        None
+            If no valid response was received
+        """
+        response, cache_key, url = await self._off_loop(known_georegister_response, street, house_number,
+                                                        postal_code, city, house_number_extra)
+        if response is not None or url is None:
+            return response
+
+        # As the Geodata API is sometimes unstable, we try to send the request a number of times
+        attempts = 2
+        for _ in range(attempts):
+            try:
+                status, body = await self.georegister.get(url)
+            except (asyncio.TimeoutError, OSError):
+                continue
+            if status == 200:
+                return await self._off_loop(parse_georegister_response, cache_key, body)
+        return None
+
+    async def request_from_google_api(self, arguments: str):
+        """
+        Asynchronous version of checker.request_from_google_api.
+
+        Parameters
+        ----------
+        arguments: str
+            The arguments that are used in the request
+
+        Raises
+        ------
+        HTTPError
+            If Google responded with an error status code
+        QuotaExceededException
+            If the budget of requests is spent, or Google keeps answering OVER_QUERY_LIMIT
+
+        Returns
+        -------
+        dict
+            A dict containing the result if a valid result was received
+        None
+            If no valid result was received
+        """
+        cache_key = normalize_key(arguments)
+        response = await self._off_loop(google_cache.get, cache_key)
+
+        if response is None:
+            # The URL is read when it is used, so that it can be changed like in checker.py
+            response = await self._send_google_request(
+                cache_key, f"{checker.GOOGLE_GEOCODE_URL}?{arguments}&key={self.api_key}")
+
+        if not response["status"] == "OK":
+            return None
+        return response
+
+    async def _send_google_request(self, cache_key: str, url: str) -> dict:
+        # Send the request again while Google answers OVER_QUERY_LIMIT, see checker.request_from_google_api
+        for _ in google_limiter.attempts():
+            await google_limiter.acquire_async()
+            status, body = await self.google.get(url)
+            if status != 200:
+                raise HTTPError(url, status, "Google Geocoding API request failed", None, None)
+            response = await self._off_loop(parse_google_response, cache_key, body)
+            if not over_query_limit(response):
+                break
+        return response
+
+    @staticmethod
+    async def _off_loop(function, *arguments):
+        # The caches read from and commit to SQLite, which would block all other lookups if it happened
+        # on the event loop, so they are used on a worker thread
+        return await asyncio.get_running_loop().run_in_executor(None, function, *arguments)
+
+    async def perform_lookups(self, lookups):
+        """
+        Asynchronous version of checker.perform_lookups.
+
+        Parameters
+        ----------
+        lookups
+            The generator, for example created by validate_entry_lookups
+
+        Returns
+        -------
+        object
+            The value that is returned by the generator
+        """
+        try:
+            kind, arguments = next(lookups)
+            while True:
+                if kind == GEOREGISTER:
+                    response = await self.query_dutch_georegister(*arguments)
+                else:
+                    response = await self.request_from_google_api(arguments)
+                kind, arguments = lookups.send(response)
+        except StopIteration as result:
+            return result.value
+
+    async def validate_entry(self, entry: dict) -> (str, dict, str):
+        """
+        Asynchronous version of checker.validate_entry.
+
+        Parameters
+        ----------
+        entry: dict
+            The entry to validate
+
+        Returns
+        -------
+        (str, dict, str)
+            The outcome of the validation, see checker.validate_entry
+        """
+        return await self.perform_lookups(validate_entry_lookups(entry))
+
+    async def close(self):
+        """
+        Closes all open connections.
+        """
+        await self.georegister.close()
+        await self.google.close()
+
+
+async def _create_engine(api_key: str) -> AsyncLookupEngine:
+    # The engine has to be created inside the event loop that it is used in
+    return AsyncLookupEngine(api_key)
+
+
+async def _close_engine(engine: AsyncLookupEngine):
+    # The validations that were cancelled have to finish before their connections are closed,
+    # otherwise they are destroyed while they are still pending
+    current = asyncio.current_task()
+    await asyncio.gather(*(task for task in asyncio.all_tasks() if task is not current), return_exceptions=True)
+    await engine.close()
+    await asyncio.get_running_loop().shutdown_default_executor()
+
+
+def validate_entries_async(api_key: str, entries: list):
+    """
+    Validates the entries using an asynchronous engine that runs on a background thread, with at
+    most ENTRIES_IN_FLIGHT entries at the same time. The outcomes are yielded in the order of the
+    entries, as soon as they are available.
+
+    Parameters
+    ----------
+    api_key: str
+        A string representing the API key
+    entries: list
+        The entries to validate, represented as dictionaries
+
+    Yields
+    ------
+    (str, dict, str)
+        The outcome of the validation of each entry, see checker.validate_entry
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    engine = asyncio.run_coroutine_threadsafe(_create_engine(api_key), loop).result()
+    pending = iter(entries)
+    futures = deque(asyncio.run_coroutine_threadsafe(engine.validate_entry(entry), loop)
+                    for entry in islice(pending, ENTRIES_IN_FLIGHT))
+    try:
+        while futures:
+            outcome = futures.popleft().result()
+            for entry in islice(pending, 1):
+                futures.append(asyncio.run_coroutine_threadsafe(engine.validate_entry(entry), loop))
+            yield outcome
+    finally:
+        for future in futures:
+            future.cancel()
+        asyncio.run_coroutine_threadsafe(_close_engine(engine), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
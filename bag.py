@@ -0,0 +1,343 @@
+"""
+File containing functionality to verify Dutch addresses offline, using a local index that is built
+from an extract of the BAG (Basisregistratie Adressen en Gebouwen)
+
+The index can be created from a CSV extract of the BAG (for example as exported by NLExtract) with:
+    python bag.py <extract.csv> [--input <input directory>]
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import struct
+from functools import lru_cache
+
+# The file in the input directory that contains the index that is used by the application
+BAG_INDEX_FILE = "bag_index.bin"
+# The maximum number of documents in a response, like the georegister returns
+MAX_DOCS = 10
+
+MAGIC = b"THBAGIX1"
+# Magic, number of records, number of strings, size of the string blob
+HEADER = struct.Struct("<8sIII")
+# Postal code, house number, house number addition, street id, city id
+RECORD = struct.Struct("<6sI6sII")
+UINT = struct.Struct("<I")
+
+# Accepted column names in BAG extracts
+COLUMN_ALIASES = {
+    "street": ("openbareruimte", "openbareruimtenaam", "straatnaam", "straat"),
+    "house_number": ("huisnummer",),
+    "house_letter": ("huisletter",),
+    "house_number_addition": ("huisnummertoevoeging", "toevoeging"),
+    "postal_code": ("postcode",),
+    "city": ("woonplaats", "woonplaatsnaam"),
+}
+
+
+def normalize_addition(addition: str) -> str:
+    """
+    Normalizes a house number addition, so that additions like '-A', ' a' and 'A' are equal.
+
+    Parameters
+    ----------
+    addition: str
+        The house number addition
+
+    Returns
+    -------
+    str:
+        The normalized house number addition
+    """
+    return ''.join(character for character in addition.lower() if character.isalnum())
+
+
+def encode_addition(addition: str) -> bytes:
+    """
+    Encodes a house number addition for a record, which has room for 6 bytes. Longer additions are
+    shortened by whole characters, so that the stored addition is still valid UTF-8.
+
+    Parameters
+    ----------
+    addition: str
+        The house number addition
+
+    Returns
+    -------
+    bytes:
+        The encoded house number addition, of at most 6 bytes
+    """
+    return addition.encode("utf8")[:6].decode("utf8", "ignore").encode("utf8")
+
+
+def _find_columns(header: list, extract_file: str) -> dict:
+    header = [name.strip().lower() for name in header]
+    columns = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        matches = [header.index(alias) for alias in aliases if alias in header]
+        if not matches and column not in ("house_letter", "house_number_addition"):
+            raise ValueError(f"Missing column '{aliases[0]}' in {extract_file}")
+        columns[column] = matches[0] if matches else None
+    return columns
+
+
+def read_extract(extract_file: str) -> (dict, set):
+    """
+    Reads the addresses from a CSV extract of the BAG.
+
+    Parameters
+    ----------
+    extract_file: str
+        The CSV file containing the BAG addresses
+
+    Raises
+    ------
+    ValueError
+        If the extract is missing a required column
+
+    Returns
+    -------
+    (dict, set)
+        A tuple containing a dict that maps every street and city name to an id, and a set of
+        addresses represented as (postal code, house number, addition, street id, city id) tuples
+    """
+    strings = {}
+    addresses = set()
+    with open(extract_file, encoding="utf8", newline="") as file:
+        dialect = csv.Sniffer().sniff(file.readline(), delimiters=",;\t")
+        file.seek(0)
+        reader = csv.reader(file, dialect)
+        columns = _find_columns(next(reader), extract_file)
+
+        for row in reader:
+            postal_code = row[columns["postal_code"]].replace(" ", "").upper()
+            if len(postal_code) != 6 or not row[columns["house_number"]].isdigit():
+                continue
+            addition = row[columns["house_letter"]].strip() if columns["house_letter"] is not None else ""
+            if columns["house_number_addition"] is not None and row[columns["house_number_addition"]].strip():
+                addition += f"-{row[columns['house_number_addition']].strip()}"
+            street = strings.setdefault(row[columns["street"]].strip(), len(strings))
+            city = strings.setdefault(row[columns["city"]].strip(), len(strings))
+            addresses.add((postal_code.encode("ascii"), int(row[columns["house_number"]]),
+                           encode_addition(addition), street, city))
+    return strings, addresses
+
+
+def import_extract(extract_file: str, index_file: str) -> int:
+    """
+    Converts a CSV extract of the BAG into a compact index, which can be used to verify addresses.
+
+    Parameters
+    ----------
+    extract_file: str
+        The CSV file containing the BAG addresses
+    index_file: str
+        The file that the index is written to
+
+    Raises
+    ------
+    ValueError
+        If the extract is missing a required column
+
+    Returns
+    -------
+    int:
+        The number of addresses in the index
+    """
+    strings, addresses = read_extract(extract_file)
+
+    # Order the strings case-insensitively, so that they can be searched in the street index
+    ordered_strings = sorted(strings, key=lambda string: (string.lower(), string))
+    string_ids = {strings[string]: i for i, string in enumerate(ordered_strings)}
+    records = sorted((postal_code, house_number, addition, string_ids[street], string_ids[city])
+                     for postal_code, house_number, addition, street, city in addresses)
+    street_index = sorted(range(len(records)),
+                          key=lambda i: (records[i][4], records[i][3], records[i][1], records[i][2]))
+
+    encoded = [string.encode("utf8") for string in ordered_strings]
+    offsets = [0]
+    for string in encoded:
+        offsets.append(offsets[-1] + len(string))
+
+    directory = os.path.dirname(index_file)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(index_file, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(records), len(encoded), offsets[-1]))
+        file.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        file.write(b"".join(encoded))
+        for record in records:
+            file.write(RECORD.pack(*record))
+        file.write(struct.pack(f"<{len(street_index)}I", *street_index))
+    return len(records)
+
+
+class BagIndex:
+    """
+    A memory-mapped index of Dutch addresses, which answers queries in the same format as the Dutch
+    georegister, without any network I/O. Records are sorted on postal code and house number, and a
+    secondary index sorts them on city, street and house number.
+    """
+
+    def __init__(self, index_file: str):
+        with open(index_file, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, string_count, blob_size = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index_file} is not a BAG index")
+        self._offsets = HEADER.size
+        self._strings = self._offsets + UINT.size * (string_count + 1)
+        self._records = self._strings + blob_size
+        self._street_index = self._records + RECORD.size * self.size
+
+    @lru_cache(maxsize=65536)
+    def string(self, string_id: int) -> str:
+        """
+        Retrieves a street or city name from the index.
+
+        Parameters
+        ----------
+        string_id: int
+            The id of the string
+
+        Returns
+        -------
+        str:
+            The street or city name
+        """
+        start, end = struct.unpack_from("<II", self._data, self._offsets + UINT.size * string_id)
+        return self._data[self._strings + start:self._strings + end].decode("utf8")
+
+    def record(self, i: int) -> (bytes, int, bytes, int, int):
+        """
+        Retrieves a record from the index.
+
+        Parameters
+        ----------
+        i: int
+            The position of the record in the index
+
+        Returns
+        -------
+        (bytes, int, bytes, int, int)
+            A tuple containing the postal code, house number, house number addition, street id and
+            city id of the address
+        """
+        return RECORD.unpack_from(self._data, self._records + RECORD.size * i)
+
+    def _by_postal_code(self, postal_code: str, house_number: int) -> range:
+        key = (postal_code.encode("ascii"), house_number)
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[:2] < key:
+                low = middle + 1
+            else:
+                high = middle
+        end = low
+        while end < self.size and self.record(end)[:2] == key:
+            end += 1
+        return range(low, end)
+
+    def _by_street(self, street: str, house_number: int, city: str) -> list:
+        def key(position):
+            record = self.record(UINT.unpack_from(self._data, self._street_index + UINT.size * position)[0])
+            return self.string(record[4]).lower(), self.string(record[3]).lower(), record[1]
+
+        search = (city.lower(), street.lower(), house_number)
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if key(middle) < search:
+                low = middle + 1
+            else:
+                high = middle
+        result = []
+        while low < self.size and key(low) == search:
+            result.append(UINT.unpack_from(self._data, self._street_index + UINT.size * low)[0])
+            low += 1
+        return result
+
+    def query(self, street, house_number, postal_code, city, house_number_extra=None):
+        """
+        Offline version of checker.query_dutch_georegister.
+
+        Parameters
+        ----------
+        street
+            The address street
+        house_number
+            The address house number
+        postal_code
+            The address postal code
+        city
+            The address city
+        house_number_extra
+            The extra part of the address house number
+
+        Returns
+        -------
+        dict
+            A dict containing a response in the format of the georegister
+        None
+            If the query can not be answered by the index
+        """
+        if not house_number or not str(house_number).isdigit():
+            return None
+        if postal_code:
+            candidates = self._by_postal_code(postal_code.replace(" ", "").upper(), int(house_number))
+        elif street and city:
+            candidates = self._by_street(street, int(house_number), city)
+        else:
+            return None
+
+        docs = []
+        for i in candidates:
+            _, number, addition, street_id, city_id = self.record(i)
+            addition = addition.rstrip(b"\0").decode("utf8")
+            if street and self.string(street_id).lower() != street.lower():
+                continue
+            if city and self.string(city_id).lower() != city.lower():
+                continue
+            if house_number_extra and normalize_addition(addition) != normalize_addition(house_number_extra):
+                continue
+            docs.append({"woonplaatsnaam": self.string(city_id), "postcode": self.record(i)[0].decode("ascii"),
+                         "straatnaam": self.string(street_id), "huis_nlt": f"{number}{addition}"})
+        return {"numFound": len(docs), "docs": docs[:MAX_DOCS]}
+
+
+@lru_cache(maxsize=None)
+def get_index(index_file: str):
+    """
+    Opens the BAG index, if it has been imported.
+
+    Parameters
+    ----------
+    index_file: str
+        The location of the index
+
+    Returns
+    -------
+    BagIndex
+        The index, if it exists
+    None
+        If no index has been imported
+    """
+    if not os.path.exists(index_file):
+        return None
+    return BagIndex(index_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Imports a CSV extract of the BAG, so that Dutch addresses "
+                                                 "can be verified without the online georegister.")
+    parser.add_argument("extract", help="the CSV file containing the BAG addresses")
+    parser.add_argument("index", nargs="?", default=None,
+                        help=f"the file the index is written to (default: {BAG_INDEX_FILE} in the input directory)")
+    parser.add_argument("--input", default="input",
+                        help="the input directory of the application, see main.py (default: input)")
+    args = parser.parse_args()
+    if args.index is None:
+        args.index = os.path.join(args.input, BAG_INDEX_FILE)
+    print(f"Imported {import_extract(args.extract, args.index)} addresses into {args.index}")
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Thabloid Sticker Generator. Run them from the root of the repository, e.g.:
+    python -m benchmarks.normalization
+"""
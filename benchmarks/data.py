@@ -0,0 +1,74 @@
+"""
+File containing functionality to generate synthetic member lists for the benchmarks
+"""
+
+import random
+
+import pandas as pd
+
+FIRST_NAMES = ['Anna', 'Bram', 'Chloë', 'Daan', 'Eva', 'Finn', 'Gijs', 'Hüseyin', 'Iris', 'Jörg', 'Lars', 'Noor']
+LAST_NAMES = ['de Vries', 'Jansen', 'van den Berg', 'Bakker', 'Visser', 'Smit', 'Meijer', 'Müller', 'Peeters']
+STREETS = ['Heyendaalseweg', 'Toernooiveld', 'Groenestraat', 'Sint Annastraat', 'Molenstraat', 'Kerkstraße',
+           'Rue de la Paix', 'Dorpsstraat', 'Hoogstraat', 'Stationsweg', 'Ubbergseweg', 'Fürstenwall']
+CITIES = {'Netherlands': ['Nijmegen', 'Arnhem', 'Utrecht', "'s-Hertogenbosch", 'Amsterdam', 'Den Haag'],
+          'Germany': ['Kleve', 'Düsseldorf', 'Köln', 'Münster'],
+          'Belgium': ['Antwerpen', 'Liège', 'Leuven']}
+
+
+def postal_code(rng: random.Random, country: str) -> str:
+    """
+    Generates a random postal code in the format of the given country.
+
+    Parameters
+    ----------
+    rng: random.Random
+        The random number generator
+    country: str
+        The country of the address
+
+    Returns
+    -------
+    str:
+        The postal code
+    """
+    if country == 'Netherlands':
+        letters = ''.join(rng.choice('ABCEGHJKLMNPRTVWXZ') for _ in range(2))
+        return f"{rng.randint(1000, 9999)}{rng.choice(['', ' '])}{rng.choice([letters, letters.lower()])}"
+    if country == 'Germany':
+        return str(rng.randint(10000, 99999))
+    return str(rng.randint(1000, 9999))
+
+
+def generate_members(size: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates a synthetic member list in the format that read_input produces. Roughly 85% of the
+    members live in the Netherlands, and some addresses are shared by multiple members.
+
+    Parameters
+    ----------
+    size: int
+        The number of members
+    seed: int
+        The seed of the random number generator, so that the same list can be generated again
+
+    Returns
+    -------
+    pd.DataFrame:
+        A DataFrame containing the members
+    """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(size):
+        country = rng.choices(list(CITIES), weights=[85, 10, 5])[0]
+        if rows and rng.random() < 0.1:
+            # Housemates share the address of a previous member
+            address = {key: rows[-1][key] for key in ('address', 'address_2', 'postal_code', 'city', 'country')}
+        else:
+            address = {'address': f"{rng.choice(STREETS)} {rng.randint(1, 300)}{rng.choice(['', '', '', 'A', '-2'])}",
+                       'address_2': rng.choice(['', '', '', '', 'Kamer 12', 'c/o Thalia']),
+                       'postal_code': postal_code(rng, country),
+                       'city': rng.choice(CITIES[country]),
+                       'country': country}
+        rows.append({'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES), **address})
+    return pd.DataFrame(rows, columns=['first_name', 'last_name', 'address', 'address_2', 'postal_code', 'city',
+                                       'country'])
@@ -0,0 +1,58 @@
+"""
+Benchmark measuring how long loading the font takes when it is parsed, and when it was already
+loaded by the same process
+
+Usage:
+    python -m benchmarks.font_loading [repetitions]
+"""
+
+import statistics
+import sys
+import time
+
+from fonts import get_font
+from pdf import FONT_FILE
+
+REPETITIONS = 50
+
+
+def load(clear: bool) -> float:
+    """
+    Measures the time that get_font takes.
+
+    Parameters
+    ----------
+    clear: bool
+        Whether the font is forgotten by the process first
+
+    Returns
+    -------
+    float:
+        The number of seconds that get_font took
+    """
+    if clear:
+        get_font.cache_clear()
+    start = time.perf_counter()
+    get_font("cmunss", FONT_FILE)
+    return time.perf_counter() - start
+
+
+def run(repetitions: int):
+    """
+    Runs the benchmark and prints the median time of every way of loading the font.
+
+    Parameters
+    ----------
+    repetitions: int
+        The number of times that the font is loaded in every way
+    """
+    results = {"parsed": [], "already loaded": []}
+    for _ in range(repetitions):
+        results["parsed"].append(load(True))
+        results["already loaded"].append(load(False))
+    for name, durations in results.items():
+        print(f"{name:<20} {statistics.median(durations) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else REPETITIONS)
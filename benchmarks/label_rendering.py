@@ -0,0 +1,55 @@
+"""
+Benchmark measuring the cost of rendering a single label, and the size of the content stream that
+every label adds to a page
+
+Usage:
+    python -m benchmarks.label_rendering [size]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.data import generate_members
+from benchmarks.pdf_rendering import measure
+from pdf import FONT_FILE, ITEMS_PER_PAGE, entry_records, generate_pdf, generate_pdf_native, label_lines, \
+    page_content
+from fonts import get_font
+from pdfwriter import FontEncoding, deflate
+
+SIZE = 10_000
+
+
+def run(size: int):
+    """
+    Runs the benchmark for a member list of the given size and prints the results.
+
+    Parameters
+    ----------
+    size: int
+        The number of members
+    """
+    members = generate_members(size)
+    labels = [label_lines(entry) for entry in entry_records(members)]
+    pages = [labels[start:start + ITEMS_PER_PAGE] for start in range(0, len(labels), ITEMS_PER_PAGE)]
+    encoding = FontEncoding(set(get_font("cmunss", FONT_FILE).face.charToGlyph),
+                            "".join(line for lines in labels for line in lines))
+
+    start = time.perf_counter()
+    contents = [page_content(encoding, page) for page in pages]
+    duration = time.perf_counter() - start
+    print(f"{size:>9} labels: content streams {duration / size * 1e6:8.2f} us/label, "
+          f"{sum(map(len, contents)) / size:7.1f} bytes/label, "
+          f"{sum(len(deflate(content)) for content in contents) / size:6.1f} bytes/label compressed")
+
+    with tempfile.TemporaryDirectory() as directory:
+        out_file = os.path.join(directory, "sticker_sheet.pdf")
+        for name, function in (("reportlab", generate_pdf), ("native", generate_pdf_native)):
+            duration = measure(function, members, out_file)
+            print(f"{size:>9} labels: {name:<15} {duration / size * 1e6:8.2f} us/label, "
+                  f"{os.path.getsize(out_file) / size:7.1f} bytes/label in the pdf")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
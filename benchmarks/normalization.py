@@ -0,0 +1,103 @@
+"""
+Benchmark comparing the columnar format_entries and post_process_entries with the original
+implementations, which looped over the entries with iterrows
+
+Usage:
+    python -m benchmarks.normalization [sizes...]
+"""
+
+import sys
+import time
+import unicodedata
+
+import pandas as pd
+
+from benchmarks.data import generate_members
+from main import format_entries, post_process_entries
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def format_entries_per_row(input_entries: pd.DataFrame) -> pd.DataFrame:
+    """
+    The original, row-by-row implementation of format_entries, used as reference.
+
+    Parameters
+    ----------
+    input_entries: pd.DataFrame
+        The input entries to be formatted
+
+    Returns
+    -------
+    pd.DataFrame:
+        The formatted entries
+    """
+    rows = []
+    for _, entry in input_entries.iterrows():
+        entry['address'] = entry['address'].replace('\xdf', 'ss')
+        entry['address_2'] = entry['address_2'].replace('\xdf', 'ss')
+        entry['city'] = entry['city'].replace('\xdf', 'ss')
+        entry['address'] = unicodedata.normalize('NFKD', entry['address']).encode('ascii', 'ignore').decode("ascii")
+        entry['address_2'] = unicodedata.normalize('NFKD', entry['address_2']).encode('ascii', 'ignore').decode("ascii")
+        entry['city'] = unicodedata.normalize('NFKD', entry['city']).encode('ascii', 'ignore').decode("ascii")
+        entry['postal_code'] = entry['postal_code'].upper()
+        rows.append(entry)
+    return pd.DataFrame(rows)
+
+
+def post_process_entries_per_row(input_entries: pd.DataFrame) -> pd.DataFrame:
+    """
+    The original, row-by-row implementation of post_process_entries, used as reference.
+
+    Parameters
+    ----------
+    input_entries: pd.DataFrame
+        The input entries to be post-processed
+
+    Returns
+    -------
+    pd.DataFrame:
+        The post-processed entries
+    """
+    rows = []
+    for _, entry in input_entries.iterrows():
+        if entry["country"] == "Netherlands" and len(entry["postal_code"]) == 6:
+            entry["postal_code"] = f"{entry['postal_code'][:4]} {entry['postal_code'][4:]}"
+        entry["city"] = entry["city"].upper()
+        entry["country"] = entry["country"].upper()
+        entry['address'] = entry['address'].replace('\xdf', 'ss')
+        entry['address_2'] = entry['address_2'].replace('\xdf', 'ss')
+        entry['city'] = entry['city'].replace('\xdf', 'ss')
+        rows.append(entry)
+    return pd.DataFrame(rows)
+
+
+def run(size: int):
+    """
+    Runs the benchmark for a member list of the given size and prints the results.
+
+    Parameters
+    ----------
+    size: int
+        The number of members
+    """
+    members = generate_members(size)
+
+    start = time.perf_counter()
+    expected = post_process_entries_per_row(format_entries_per_row(members.copy()))
+    per_row = time.perf_counter() - start
+
+    entries = members.copy()
+    start = time.perf_counter()
+    format_entries(entries)
+    post_process_entries(entries)
+    columnar = time.perf_counter() - start
+
+    if not entries.equals(expected):
+        raise AssertionError(f"Columnar normalization differs from the reference for {size} rows")
+    print(f"{size:>9} rows: per row {per_row:8.3f}s, columnar {columnar:8.3f}s, speedup {per_row / columnar:6.1f}x")
+
+
+if __name__ == "__main__":
+    for argument in sys.argv[1:] or SIZES:
+        run(int(argument))
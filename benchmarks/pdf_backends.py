@@ -0,0 +1,69 @@
+"""
+Benchmark comparing the reportlab and native backends of the pdf generation, measuring wall time,
+CPU time and the peak memory that is allocated while rendering
+
+Usage:
+    python -m benchmarks.pdf_backends [sizes...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.data import generate_members
+from benchmarks.pdf_rendering import measure
+from pdf import generate_pdf, generate_pdf_native
+
+SIZES = [1_000, 10_000, 100_000]
+BACKENDS = {"reportlab": generate_pdf, "native": generate_pdf_native}
+
+
+def peak_memory(function, *arguments) -> int:
+    """
+    Measures the peak amount of memory that a pdf generation function allocates.
+
+    Parameters
+    ----------
+    function
+        The function that generates the pdf
+    arguments
+        The arguments of the function
+
+    Returns
+    -------
+    int:
+        The peak number of bytes that were allocated
+    """
+    tracemalloc.start()
+    measure(function, *arguments)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def run(size: int):
+    """
+    Runs the benchmark for a member list of the given size and prints the results.
+
+    Parameters
+    ----------
+    size: int
+        The number of members
+    """
+    members = generate_members(size)
+    with tempfile.TemporaryDirectory() as directory:
+        out_file = os.path.join(directory, "sticker_sheet.pdf")
+        for name, function in BACKENDS.items():
+            cpu_start = time.process_time()
+            duration = measure(function, members, out_file)
+            cpu = time.process_time() - cpu_start
+            peak = peak_memory(function, members, out_file)
+            print(f"{size:>9} rows: {name:<10} wall {duration:8.3f}s, cpu {cpu:8.3f}s, "
+                  f"peak memory {peak / 2 ** 20:8.1f} MiB, size {os.path.getsize(out_file) / 2 ** 20:7.2f} MiB")
+
+
+if __name__ == "__main__":
+    for argument in sys.argv[1:] or SIZES:
+        run(int(argument))
@@ -0,0 +1,70 @@
+"""
+Benchmark measuring the number of pages per second that generate_pdf and generate_pdf_sharded
+render, for different numbers of processes
+
+Usage:
+    python -m benchmarks.pdf_rendering [size] [workers...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.data import generate_members
+from pdf import ITEMS_PER_PAGE, generate_pdf, generate_pdf_sharded
+
+SIZE = 100_000
+WORKERS = [1, 2, 4, 8]
+
+
+def measure(function, *arguments) -> float:
+    """
+    Measures the time that a pdf generation function takes, without its console output.
+
+    Parameters
+    ----------
+    function
+        The function that generates the pdf
+    arguments
+        The arguments of the function
+
+    Returns
+    -------
+    float:
+        The number of seconds that the function took
+    """
+    stdout = sys.stdout
+    with open(os.devnull, "w", encoding="utf8") as sys.stdout:
+        start = time.perf_counter()
+        function(*arguments)
+        duration = time.perf_counter() - start
+    sys.stdout = stdout
+    return duration
+
+
+def run(size: int, workers: list):
+    """
+    Runs the benchmark for a member list of the given size and prints the results.
+
+    Parameters
+    ----------
+    size: int
+        The number of members
+    workers: list
+        The numbers of processes to measure the sharded renderer with
+    """
+    members = generate_members(size)
+    pages = -(-size // ITEMS_PER_PAGE)
+    with tempfile.TemporaryDirectory() as directory:
+        out_file = os.path.join(directory, "sticker_sheet.pdf")
+        duration = measure(generate_pdf, members, out_file)
+        print(f"{pages:>7} pages: reportlab            {duration:8.3f}s, {pages / duration:9.1f} pages/s")
+        for count in workers:
+            duration = measure(generate_pdf_sharded, members, out_file, count)
+            print(f"{pages:>7} pages: sharded, {count:>2} process(es) {duration:8.3f}s, "
+                  f"{pages / duration:9.1f} pages/s")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE, [int(argument) for argument in sys.argv[2:]] or WORKERS)
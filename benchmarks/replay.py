@@ -0,0 +1,135 @@
+"""
+Benchmark measuring the validation of entries without a network. The responses of the local stub
+endpoints are recorded in a cassette once, after which both validation engines replay them with
+several injected latencies, so that changes to the validation cascade can be measured offline.
+
+Usage:
+    python -m benchmarks.replay [size] [--cassette FILE] [--latencies 0 0.01 0.05]
+
+An existing cassette is reused, so a cassette recorded against the real services can be replayed
+as well, as long as it contains the responses for the generated members of the same size.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from functools import partial
+
+import async_checker
+import checker
+from benchmarks.data import generate_members
+from benchmarks.stub_server import GEOREGISTER_PATH, GOOGLE_GEOCODE_PATH
+from benchmarks.suite import ROOT, timed, write_input
+from correction import correct_entries
+from main import VALIDATION_WORKERS, format_entries
+from ratelimit import google_limiter
+from transport import RecordingTransport, ReplayTransport, network
+
+SIZE = 1_000
+# The injected latencies, in seconds, that every engine is measured with
+LATENCIES = [0.0, 0.01, 0.05]
+ENGINES = {
+    "threads": partial(checker.validate_entries, workers=VALIDATION_WORKERS),
+    "async": async_checker.validate_entries_async,
+}
+
+
+def validate(members, engine: str) -> dict:
+    """
+    Validates a member list with one of the engines in a fresh working directory, so that no cache
+    of an earlier run is used.
+
+    Parameters
+    ----------
+    members: pd.DataFrame
+        The members
+    engine: str
+        The name of the engine
+
+    Returns
+    -------
+    dict:
+        The wall and CPU time of the validation in seconds
+    """
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            write_input(members, "input")
+            os.makedirs("output")
+            _, times = timed(correct_entries, members.copy(), "output", ENGINES[engine], False, "drop")
+        finally:
+            os.chdir(working_directory)
+    return times
+
+
+def record(members, cassette: str):
+    """
+    Records the responses of the local stub endpoints to the requests of both engines.
+
+    Parameters
+    ----------
+    members: pd.DataFrame
+        The members
+    cassette: str
+        The cassette file that the responses are written to
+    """
+    with subprocess.Popen([sys.executable, "-m", "benchmarks.stub_server"], cwd=ROOT, stdout=subprocess.PIPE,
+                          text=True) as server:
+        try:
+            endpoint = server.stdout.readline().strip()
+            checker.GEOREGISTER_URL = endpoint + GEOREGISTER_PATH
+            checker.GOOGLE_GEOCODE_URL = endpoint + GOOGLE_GEOCODE_PATH
+            previous = network.use(RecordingTransport(cassette))
+            try:
+                for engine in ENGINES:
+                    validate(members, engine)
+            finally:
+                network.use(previous)
+        finally:
+            server.terminate()
+
+
+def run(size: int, cassette: str, latencies: list):
+    """
+    Runs the benchmark for a member list of the given size and prints the results.
+
+    Parameters
+    ----------
+    size: int
+        The number of members
+    cassette: str
+        The cassette file, which is recorded first if it does not exist
+    latencies: list
+        The injected latencies in seconds
+    """
+    members = generate_members(size)
+    format_entries(members)
+    # Replayed responses have no quota, so the validation is measured without waiting for the rate limiter
+    google_limiter.configure(rate=None)
+    if not os.path.exists(cassette):
+        record(members, cassette)
+        print(f"Recorded the responses in {cassette}")
+    for latency in latencies:
+        network.use(ReplayTransport(cassette, latency))
+        for engine in ENGINES:
+            times = validate(members, engine)
+            print(f"{size} rows, {engine:<7} engine, latency {latency * 1000:5.1f} ms: wall {times['wall']:8.3f}s, "
+                  f"cpu {times['cpu']:8.3f}s, {size / max(times['wall'], 1e-9):9.0f} rows/s")
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description="Benchmarks the validation of entries without a network.")
+    PARSER.add_argument("size", type=int, nargs="?", default=SIZE, help=f"the number of members (default: {SIZE})")
+    PARSER.add_argument("--cassette", default=None,
+                        help="the cassette file (default: a temporary file that is recorded from the stub endpoints)")
+    PARSER.add_argument("--latencies", type=float, nargs="+", default=LATENCIES,
+                        help="the injected latencies in seconds")
+    ARGUMENTS = PARSER.parse_args()
+    if ARGUMENTS.cassette is not None:
+        run(ARGUMENTS.size, ARGUMENTS.cassette, ARGUMENTS.latencies)
+    else:
+        with tempfile.TemporaryDirectory() as CASSETTE_DIR:
+            run(ARGUMENTS.size, os.path.join(CASSETTE_DIR, "cassette.jsonl"), ARGUMENTS.latencies)
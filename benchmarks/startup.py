@@ -0,0 +1,76 @@
+"""
+Benchmark measuring how long it takes to import the application in a fresh interpreter. It fails if
+a module that should be imported lazily is loaded during startup. The import time depends on the
+machine, so it is only reported, unless a budget is given that the median import time should stay
+within (for example IMPORT_BUDGET).
+
+Usage:
+    python -m benchmarks.startup [budget in ms]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# The maximum median time (in ms) that importing the application should take on a development machine
+IMPORT_BUDGET = 250
+REPETITIONS = 15
+# The heavy modules that should only be imported by the stage that needs them
+DEFERRED_MODULES = ("pandas", "numpy", "tqdm", "reportlab.pdfgen.canvas", "reportlab.pdfbase.ttfonts",
+                    "urllib.request", "http.client", "asyncio", "ssl")
+# The script that is run by every fresh interpreter
+SCRIPT = f"""
+import json, sys, time, types
+start = time.perf_counter()
+import main
+duration = time.perf_counter() - start
+loaded = [name for name in {DEFERRED_MODULES!r} if type(sys.modules.get(name)) is types.ModuleType]
+print(json.dumps({{"duration": duration, "loaded": loaded}}))
+"""
+
+
+def measure() -> dict:
+    """
+    Imports the application in a fresh interpreter.
+
+    Returns
+    -------
+    dict:
+        The import time in seconds, and the deferred modules that were loaded by the import
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=root, capture_output=True, check=True, text=True)
+    return json.loads(result.stdout)
+
+
+def run(budget: float = None) -> bool:
+    """
+    Runs the benchmark and prints the results.
+
+    Parameters
+    ----------
+    budget: float
+        The maximum median import time in milliseconds, or None to only report the import time
+
+    Returns
+    -------
+    bool:
+        True if no deferred module was loaded and the import time is within the budget, if any
+    """
+    # The first import may compile the modules, which is not part of the startup time
+    measure()
+    results = [measure() for _ in range(REPETITIONS)]
+    durations = sorted(result["duration"] * 1000 for result in results)
+    loaded = sorted(set(name for result in results for name in result["loaded"]))
+    print(f"import main: median {statistics.median(durations):.1f} ms, min {durations[0]:.1f} ms, "
+          f"max {durations[-1]:.1f} ms" + (f" (budget {budget:.0f} ms)" if budget is not None else ""))
+    if loaded:
+        print(f"Deferred modules loaded during startup: {', '.join(loaded)}")
+    return not loaded and (budget is None or statistics.median(durations) <= budget)
+
+
+if __name__ == "__main__":
+    if not run(float(sys.argv[1]) if len(sys.argv) > 1 else None):
+        sys.exit("Startup loads deferred modules or is slower than the budget")
@@ -0,0 +1,132 @@
+"""
+A local HTTP server that imitates the Dutch georegister and the Google Geocoding API, so that the
+validation of entries can be benchmarked without sending requests to the real services. Every
+answer only depends on the request, so repeated runs send the same requests.
+
+Usage:
+    python -m benchmarks.stub_server [port]
+
+The URL of the server is printed on the first line of the output.
+"""
+
+import hashlib
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# The paths that the endpoints are served on
+GEOREGISTER_PATH = "/locatieserver/v3/free"
+GOOGLE_GEOCODE_PATH = "/maps/api/geocode/json"
+# The percentage of queries that the georegister and the Google Geocoding API do not find
+GEOREGISTER_MISSES = 15
+GOOGLE_MISSES = 30
+
+
+def bucket(text: str) -> int:
+    """
+    Maps a request to a number from 0 to 99 that is the same in every run.
+
+    Parameters
+    ----------
+    text: str
+        The request
+
+    Returns
+    -------
+    int:
+        A number from 0 to 99
+    """
+    return int.from_bytes(hashlib.sha1(text.encode("utf8")).digest()[:4], "big") % 100
+
+
+def georegister_response(query: dict, text: str) -> dict:
+    """
+    Answers a georegister query with the address that was asked for, unless the query is not found.
+
+    Parameters
+    ----------
+    query: dict
+        The parsed query string of the request
+    text: str
+        The query string of the request
+
+    Returns
+    -------
+    dict:
+        The response, in the format of the georegister
+    """
+    if bucket(text) < GEOREGISTER_MISSES:
+        return {"response": {"numFound": 0, "docs": []}}
+    filters = dict(value.split(":", 1) for value in query.get("fq", []) if ":" in value)
+    postal_code = filters.get("postcode", "6525 AA").replace(" ", "")
+    return {"response": {"numFound": 1, "docs": [{
+        "straatnaam": filters.get("straatnaam", "Heyendaalseweg").title(),
+        "huis_nlt": filters.get("huisnummer", "1") + query.get("q", [""])[0],
+        "postcode": postal_code,
+        "woonplaatsnaam": filters.get("woonplaatsnaam", "Nijmegen").title()}]}}
+
+
+def google_response(query: dict, text: str) -> dict:
+    """
+    Answers a Google Geocoding API request with an address in the Netherlands, unless the address
+    is not found.
+
+    Parameters
+    ----------
+    query: dict
+        The parsed query string of the request
+    text: str
+        The query string of the request
+
+    Returns
+    -------
+    dict:
+        The response, in the format of the Google Geocoding API
+    """
+    address = query.get("address", [""])[0]
+    if bucket(text) < GOOGLE_MISSES:
+        return {"status": "ZERO_RESULTS", "results": []}
+    components = [("route", address.rstrip("0123456789 ").title() or "Heyendaalseweg"),
+                  ("street_number", str(bucket(address) + 1)), ("postal_code", "6525 AA"),
+                  ("locality", "Nijmegen"), ("country", "Netherlands")]
+    return {"status": "OK", "results": [{"address_components": [
+        {"types": [kind], "long_name": name, "short_name": name} for kind, name in components]}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Handles the requests to the imitated endpoints.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Answers a GET request.
+        """
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == GEOREGISTER_PATH:
+            body = georegister_response(query, url.query)
+        elif url.path == GOOGLE_GEOCODE_PATH:
+            body = google_response(query, url.query)
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """
+        Does not log requests, because there are a lot of them.
+        """
+
+
+if __name__ == "__main__":
+    SERVER = ThreadingHTTPServer(("127.0.0.1", int(sys.argv[1]) if len(sys.argv) > 1 else 0), StubHandler)
+    print(f"http://127.0.0.1:{SERVER.server_address[1]}", flush=True)
+    SERVER.serve_forever()
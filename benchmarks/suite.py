@@ -0,0 +1,271 @@
+"""
+Benchmark suite measuring every stage of the application on generated member lists: reading the
+input files, formatting the entries, correcting them against local stub endpoints, post-processing
+them and generating the pdf. Every size runs in a fresh process and working directory, so no cache
+or earlier run influences the results.
+
+Stages that are not selected still run, because the later stages expect their results, but they are
+not measured. The only exception is correct_entries, which is skipped. It takes far longer than the
+other stages, so leave it out for the largest sizes.
+
+Usage:
+    python -m benchmarks.suite run [--sizes 1000 10000 ...] [--stages ...] [--output results.json]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.1]
+
+The compare command exits with a non-zero status if a stage became slower than the threshold allows.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+
+import checker
+from benchmarks.data import generate_members
+from benchmarks.stub_server import GEOREGISTER_PATH, GOOGLE_GEOCODE_PATH
+from correction import correct_entries
+from main import PARSING_PROCESSES, VALIDATION_WORKERS, find_input_files, format_entries, post_process_entries, \
+    read_input
+from pdf import generate_pdf
+from ratelimit import google_limiter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+STAGES = ["read_input", "format_entries", "correct_entries", "post_process_entries", "generate_pdf"]
+RESULTS_FILE = "benchmark_results.json"
+# The number of CSV files that the members are spread over, so that they are parsed in parallel
+INPUT_FILES = 4
+# The relative increase in wall time above which a stage is reported as a regression
+THRESHOLD = 0.1
+# Differences below this number of seconds are considered noise
+MIN_DIFFERENCE = 0.05
+
+
+def write_input(members, input_dir: str):
+    """
+    Writes a member list to CSV files in the format that the application reads.
+
+    Parameters
+    ----------
+    members: pd.DataFrame
+        The members
+    input_dir: str
+        The directory that the files are written to
+    """
+    os.makedirs(input_dir)
+    size = -(-len(members) // INPUT_FILES)
+    for number, start in enumerate(range(0, len(members), size)):
+        members.iloc[start:start + size].to_csv(os.path.join(input_dir, f"members_{number}.csv"), index=False)
+    with open(os.path.join(input_dir, "credentials.json"), "w", encoding="utf8") as file:
+        json.dump({"google_maps_api_key": "BENCHMARK"}, file)
+
+
+def timed(function, *arguments) -> (object, dict):
+    """
+    Calls a function without its console output, and measures its wall and CPU time.
+
+    Parameters
+    ----------
+    function
+        The function to call
+    arguments
+        The arguments of the function
+
+    Returns
+    -------
+    (object, dict)
+        A tuple containing the result of the function, and its wall and CPU time in seconds
+    """
+    with open(os.devnull, "w", encoding="utf8") as devnull, \
+            contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = function(*arguments)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return result, {"wall": round(wall, 4), "cpu": round(cpu, 4)}
+
+
+def run_stages(size: int, stages: list, endpoint: str) -> list:
+    """
+    Runs the stages of the application on a generated member list, like main.py does, in the
+    current working directory.
+
+    Parameters
+    ----------
+    size: int
+        The number of members
+    stages: list
+        The names of the stages that are measured
+    endpoint: str
+        The URL of the stub server, see benchmarks.stub_server
+
+    Returns
+    -------
+    list
+        The measurements of every stage
+    """
+    checker.GEOREGISTER_URL = endpoint + GEOREGISTER_PATH
+    checker.GOOGLE_GEOCODE_URL = endpoint + GOOGLE_GEOCODE_PATH
+    # The stub server has no quota, so the validation is measured without waiting for the rate limiter
+    google_limiter.configure(rate=None)
+    members = generate_members(size)
+    write_input(members, "input")
+    os.makedirs("output")
+
+    entries = members
+    steps = {
+        "read_input": lambda: read_input(find_input_files("input", False), "output/erroneous_lines.log",
+                                         PARSING_PROCESSES)[0],
+        "format_entries": lambda: format_entries(entries),
+        "correct_entries": lambda: correct_entries(entries, "output", partial(checker.validate_entries,
+                                                                              workers=VALIDATION_WORKERS),
+                                                   False, "drop"),
+        "post_process_entries": lambda: post_process_entries(entries),
+        "generate_pdf": lambda: generate_pdf(entries, "output/sticker_sheet.pdf"),
+    }
+    results = []
+    for stage in STAGES:
+        if stage == "correct_entries" and stage not in stages:
+            continue
+        result, times = timed(steps[stage])
+        if stage == "read_input":
+            entries = result
+        if stage in stages:
+            results.append({"stage": stage, "rows": size, **times})
+    return results
+
+
+def run(sizes: list, stages: list, output: str) -> dict:
+    """
+    Runs the benchmark suite and writes the results to a JSON file.
+
+    Parameters
+    ----------
+    sizes: list
+        The numbers of members
+    stages: list
+        The names of the stages that are measured
+    output: str
+        The file that the results are written to
+
+    Returns
+    -------
+    dict:
+        The results, including a description of the environment
+    """
+    with subprocess.Popen([sys.executable, "-m", "benchmarks.stub_server"], cwd=ROOT, stdout=subprocess.PIPE,
+                          text=True) as server:
+        try:
+            endpoint = server.stdout.readline().strip()
+            results = []
+            for size in sizes:
+                with tempfile.TemporaryDirectory() as directory:
+                    process = subprocess.run([sys.executable, "-m", "benchmarks.suite", "stages", str(size),
+                                              endpoint, directory, *stages],
+                                             cwd=ROOT, stdout=subprocess.PIPE, check=True, text=True)
+                for result in json.loads(process.stdout):
+                    print(f"{result['rows']:>9} rows: {result['stage']:<22} wall {result['wall']:9.3f}s, "
+                          f"cpu {result['cpu']:9.3f}s, {result['rows'] / max(result['wall'], 1e-9):12.0f} rows/s")
+                    results.append(result)
+        finally:
+            server.terminate()
+
+    report = {"created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+              "results": results}
+    with open(output, "w", encoding="utf8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}")
+    return report
+
+
+def compare(baseline_file: str, results_file: str, threshold: float = THRESHOLD) -> list:
+    """
+    Compares benchmark results with a stored baseline and prints the differences.
+
+    Parameters
+    ----------
+    baseline_file: str
+        The JSON file containing the baseline results
+    results_file: str
+        The JSON file containing the new results
+    threshold: float
+        The relative increase in wall time above which a stage is reported as a regression
+
+    Returns
+    -------
+    list
+        The stages and sizes that became slower than the threshold allows
+    """
+    with open(baseline_file, encoding="utf8") as file:
+        baseline = {(result["stage"], result["rows"]): result for result in json.load(file)["results"]}
+    with open(results_file, encoding="utf8") as file:
+        results = json.load(file)["results"]
+
+    regressions = []
+    for result in results:
+        key = (result["stage"], result["rows"])
+        if key not in baseline:
+            print(f"{key[1]:>9} rows: {key[0]:<22} not in the baseline")
+            continue
+        before, after = baseline[key]["wall"], result["wall"]
+        change = (after - before) / before if before > 0 else 0.0
+        regression = after - before > MIN_DIFFERENCE and change > threshold
+        print(f"{key[1]:>9} rows: {key[0]:<22} {before:9.3f}s -> {after:9.3f}s ({change:+7.1%})"
+              f"{'  REGRESSION' if regression else ''}")
+        if regression:
+            regressions.append(key)
+    return regressions
+
+
+def parse_arguments(arguments: list = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments of the benchmark suite.
+
+    Parameters
+    ----------
+    arguments: list
+        The command line arguments, or None to use sys.argv
+
+    Returns
+    -------
+    argparse.Namespace
+        The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks every stage of the application.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks and write the results to a JSON file")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="the numbers of members")
+    run_parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="the stages to measure")
+    run_parser.add_argument("--output", default=RESULTS_FILE, help=f"the results file (default: {RESULTS_FILE})")
+    compare_parser = commands.add_parser("compare", help="compare results with a baseline")
+    compare_parser.add_argument("baseline", help="the JSON file containing the baseline results")
+    compare_parser.add_argument("results", help="the JSON file containing the new results")
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                                help=f"the relative slowdown that is reported as a regression (default: {THRESHOLD})")
+    # Used by the run command to measure a single size in a fresh process
+    stages_parser = commands.add_parser("stages")
+    stages_parser.add_argument("size", type=int)
+    stages_parser.add_argument("endpoint")
+    stages_parser.add_argument("directory")
+    stages_parser.add_argument("stages", nargs="+", choices=STAGES)
+    return parser.parse_args(arguments)
+
+
+if __name__ == "__main__":
+    ARGUMENTS = parse_arguments()
+    if ARGUMENTS.command == "run":
+        run(ARGUMENTS.sizes, ARGUMENTS.stages, ARGUMENTS.output)
+    elif ARGUMENTS.command == "compare":
+        if compare(ARGUMENTS.baseline, ARGUMENTS.results, ARGUMENTS.threshold):
+            sys.exit("Some stages became slower than the baseline")
+    else:
+        sys.path.insert(0, ROOT)
+        os.chdir(ARGUMENTS.directory)
+        print(json.dumps(run_stages(ARGUMENTS.size, ARGUMENTS.stages, ARGUMENTS.endpoint)))
@@ -0,0 +1,335 @@
+"""
+File containing functionality to cache API responses and validation outcomes on disk, so that
+repeated runs do not have to send the same requests again
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from util import input_files
+
+# The file in the input directory in which all cached responses are stored, next to the credentials file
+CACHE_FILE = "cache.sqlite"
+# The default time (in seconds) that a cached response stays valid
+DAY = 24 * 60 * 60
+GOOGLE_CACHE_TTL = 180 * DAY
+GEOREGISTER_CACHE_TTL = 30 * DAY
+LEDGER_TTL = 180 * DAY
+# The maximum number of georegister responses that are kept in memory
+GEOREGISTER_MEMORY_SIZE = 4096
+# The maximum number of keys in a single query, which SQLite limits
+BATCH_SIZE = 500
+
+
+def normalize_key(key: str) -> str:
+    """
+    Normalizes a cache key, so that requests that only differ in capitalization or whitespace
+    share the same cache entry.
+
+    Parameters
+    ----------
+    key: str
+        The cache key, for example the arguments of a request
+
+    Returns
+    -------
+    str:
+        The normalized cache key
+    """
+    return ' '.join(key.replace('+', ' ').lower().split())
+
+
+class PersistentCache:
+    """
+    A thread-safe cache that stores JSON-serializable values in a table of an SQLite database.
+    The database is only opened when the cache is used for the first time. Unless another path is
+    configured, it is the CACHE_FILE in the input directory at that time.
+    """
+
+    def __init__(self, table: str, ttl: float = None, path: str = None):
+        self.table = table
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def configure(self, path: str = None, ttl: float = None):
+        """
+        Changes the location and/or time to live of the cache. Closes the current database, so
+        that the new location is used on the next lookup.
+
+        Parameters
+        ----------
+        path: str
+            The path to the SQLite database file
+        ttl: float
+            The number of seconds that a cached value stays valid, or None to keep values forever
+        """
+        with self._lock:
+            if path is not None and path != self.path:
+                self._close()
+                self.path = path
+            self.ttl = ttl
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            path = self.path if self.path is not None else input_files.path(CACHE_FILE)
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} "
+                                     f"(key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                                     f"created REAL NOT NULL)")
+            self._connection.commit()
+        return self._connection
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def get(self, key: str):
+        """
+        Retrieves a value from the cache.
+
+        Parameters
+        ----------
+        key: str
+            The (normalized) key of the value
+
+        Returns
+        -------
+        object
+            The cached value, if it is present and has not expired
+        None
+            If there is no valid cached value
+        """
+        with self._lock:
+            row = self._connect().execute(f"SELECT value, created FROM {self.table} WHERE key = ?",
+                                          (key,)).fetchone()
+            if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value):
+        """
+        Stores a value in the cache, replacing any previous value with the same key.
+
+        Parameters
+        ----------
+        key: str
+            The (normalized) key of the value
+        value
+            The JSON-serializable value to store
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, created) "
+                               f"VALUES (?, ?, ?)", (key, json.dumps(value), time.time()))
+            connection.commit()
+
+    def get_many(self, keys: list) -> list:
+        """
+        Retrieves multiple values from the cache at once, which is much faster than calling get for
+        every key.
+
+        Parameters
+        ----------
+        keys: list
+            The (normalized) keys of the values
+
+        Returns
+        -------
+        list
+            The cached values in the order of the keys, with None for every key that has no valid
+            cached value
+        """
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), BATCH_SIZE):
+                batch = unique_keys[start:start + BATCH_SIZE]
+                rows = connection.execute(f"SELECT key, value, created FROM {self.table} "
+                                          f"WHERE key IN ({', '.join('?' * len(batch))})", batch).fetchall()
+                found.update((key, value) for key, value, created in rows
+                             if self.ttl is None or time.time() - created <= self.ttl)
+            self.hits += sum(key in found for key in keys)
+            self.misses += sum(key not in found for key in keys)
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def set_many(self, items: list):
+        """
+        Stores multiple values in the cache in a single transaction.
+
+        Parameters
+        ----------
+        items: list
+            Tuples containing the (normalized) key and the JSON-serializable value to store
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(f"INSERT OR REPLACE INTO {self.table} (key, value, created) "
+                                   f"VALUES (?, ?, ?)", [(key, json.dumps(value), now) for key, value in items])
+            connection.commit()
+
+    def stats(self) -> str:
+        """
+        Returns a human-readable summary of the cache usage.
+
+        Returns
+        -------
+        str:
+            A string containing the number of cache hits and misses
+        """
+        return f"{self.hits} hit(s), {self.misses} miss(es)"
+
+
+class LRUCache:
+    """
+    A thread-safe in-memory cache with a maximum size. When the cache is full, the least recently
+    used value is evicted.
+    """
+
+    def __init__(self, max_size: int, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Retrieves a value from the cache and marks it as recently used.
+
+        Parameters
+        ----------
+        key: str
+            The key of the value
+
+        Returns
+        -------
+        object
+            The cached value, if it is present and has not expired
+        None
+            If there is no valid cached value
+        """
+        with self._lock:
+            item = self._values.get(key)
+            if item is None or (self.ttl is not None and time.time() - item[1] > self.ttl):
+                self.misses += 1
+                return None
+            self._values.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value):
+        """
+        Stores a value in the cache, evicting the least recently used value if the cache is full.
+
+        Parameters
+        ----------
+        key: str
+            The key of the value
+        value
+            The value to store
+        """
+        with self._lock:
+            self._values[key] = (value, time.time())
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+                self.evictions += 1
+
+
+class TieredCache:
+    """
+    A cache consisting of a fast in-memory LRU layer in front of a persistent SQLite layer. Values
+    that are found in the persistent layer are promoted to the memory layer.
+    """
+
+    def __init__(self, table: str, ttl: float = None, max_size: int = GEOREGISTER_MEMORY_SIZE,
+                 path: str = None):
+        self.memory = LRUCache(max_size, ttl)
+        self.persistent = PersistentCache(table, ttl, path)
+
+    def configure(self, path: str = None, ttl: float = None):
+        """
+        Changes the location of the persistent layer and/or the time to live of both layers.
+
+        Parameters
+        ----------
+        path: str
+            The path to the SQLite database file
+        ttl: float
+            The number of seconds that a cached value stays valid, or None to keep values forever
+        """
+        self.memory.ttl = ttl
+        self.persistent.configure(path, ttl)
+
+    def get(self, key: str):
+        """
+        Retrieves a value from the memory layer, or from the persistent layer if it is not in memory.
+
+        Parameters
+        ----------
+        key: str
+            The key of the value
+
+        Returns
+        -------
+        object
+            The cached value, if it is present and has not expired
+        None
+            If there is no valid cached value
+        """
+        value = self.memory.get(key)
+        if value is None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value):
+        """
+        Stores a value in both layers of the cache.
+
+        Parameters
+        ----------
+        key: str
+            The key of the value
+        value
+            The JSON-serializable value to store
+        """
+        self.memory.set(key, value)
+        self.persistent.set(key, value)
+
+    def stats(self) -> str:
+        """
+        Returns a human-readable summary of the cache usage.
+
+        Returns
+        -------
+        str:
+            A string containing the number of hits per layer, misses and evictions
+        """
+        return f"{self.memory.hits} memory hit(s), {self.persistent.hits} disk hit(s), " \
+               f"{self.persistent.misses} miss(es), {self.memory.evictions} eviction(s)"
+
+
+google_cache = PersistentCache("google_geocode", GOOGLE_CACHE_TTL)
+georegister_cache = TieredCache("georegister", GEOREGISTER_CACHE_TTL)
+# The outcomes of earlier validations, keyed by the hash of the input row
+ledger = PersistentCache("ledger", LEDGER_TTL)
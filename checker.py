@@ -5,18 +5,31 @@ File containing functionality to validate and alter addresses using various APIs
 import os
 import json
 import re
-from http.client import RemoteDisconnected
-from urllib import request
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from urllib.error import HTTPError, URLError
 from json import JSONDecodeError
 
-from tqdm import tqdm
-import pandas as pd
+from util import format_dutch_address, input_files, lazy_import
+from bag import BAG_INDEX_FILE, get_index
+from postcodes import resolve_postal_code
+from cache import google_cache, georegister_cache, normalize_key
+from ratelimit import google_limiter
+from transport import network
 
-from util import entry_to_string, query_yes_no, format_dutch_address
+# The HTTP client is only imported when the first request is sent
+client = lazy_import("http.client")
 
 dutch_postal_code_regex = re.compile(r"^[1-9]\d{3} ?(?!SA|SD|SS)[A-Z]{2}$")
 
+GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GEOREGISTER_URL = "https://geodata.nationaalgeoregister.nl/locatieserver/v3/free"
+# The file in the input directory that contains the API key
+CREDENTIALS_FILE = "credentials.json"
+# The kinds of lookups that the validation methods can request
+GEOREGISTER = "georegister"
+GOOGLE = "google"
+
 
 class InvalidApiKeyException(Exception):
     """
@@ -29,8 +42,8 @@ class InvalidApiKeyException(Exception):
 
 def get_api_key() -> str:
     """
-    Retrieves the API key from the credentials.json file, or raises an exception if no valid API
-    key was stored there.
+    Retrieves the API key from the credentials file in the input directory, or raises an exception
+    if no valid API key was stored there.
 
     Raises
     ------
@@ -43,12 +56,13 @@ def get_api_key() -> str:
         The API key, formatted as a string
     """
     # Check that the credentials file exists
-    if not os.path.exists("input/credentials.json"):
-        with open("input/credentials.json", "w", encoding='utf8') as file:
+    credentials_file = input_files.path(CREDENTIALS_FILE)
+    if not os.path.exists(credentials_file):
+        with open(credentials_file, "w", encoding='utf8') as file:
             file.write('''{\n\t"google_maps_api_key": "INSERT_MAPS_API_KEY"\n}''')
-        raise InvalidApiKeyException("No Google Maps API key given (input/credentials.json)")
+        raise InvalidApiKeyException(f"No Google Maps API key given ({credentials_file})")
 
-    with open("input/credentials.json", encoding='utf8') as file:
+    with open(credentials_file, encoding='utf8') as file:
         # Attempt to parse the json
         try:
             data = json.load(file)
@@ -75,10 +89,10 @@ def get_api_key() -> str:
                                          "Thabloid committee drive")
 
         # Check that the api key is valid
-        url = f"https://maps.googleapis.com/maps/api/geocode/json?address=a&key={api_key}"
-        with request.urlopen(url) as response:
-            if json.loads(response.read())["status"] == "REQUEST_DENIED":
-                raise InvalidApiKeyException("The API key in credentials.json was invalid")
+        url = f"{GOOGLE_GEOCODE_URL}?address=a&key={api_key}"
+        google_limiter.acquire()
+        if json.loads(network.get(url))["status"] == "REQUEST_DENIED":
+            raise InvalidApiKeyException("The API key in credentials.json was invalid")
 
     return api_key
 
@@ -87,6 +101,8 @@ def request_from_google_api(api_key: str, arguments: str):
     """
     Sends a request to Googles Geocode API using an API key and provided some arguments.
     The results are formatted and returned. If no valid result was received, 'None' is returned.
+    Responses are cached on disk, so a request with the same arguments is only sent once. Requests
+    are limited by ratelimit.google_limiter, and sent again while Google answers OVER_QUERY_LIMIT.
 
     Parameters
     ----------
@@ -97,8 +113,8 @@ def request_from_google_api(api_key: str, arguments: str):
 
     Raises
     ------
-    ValueError
-        If an invalid default value is given
+    QuotaExceededException
+        If the budget of requests is spent, or Google keeps answering OVER_QUERY_LIMIT
 
     Returns
     -------
@@ -107,16 +123,65 @@ def request_from_google_api(api_key: str, arguments: str):
     None
         If no valid result was received
     """
-    url = f"https://maps.googleapis.com/maps/api/geocode/json?{arguments}&key={api_key}"
-    with request.urlopen(url) as response:
-        try:
-            response = json.loads(response.read().decode("utf-8"))
-        except NameError:
-            return None
+    # Check whether we have already seen this request in an earlier run
+    cache_key = normalize_key(arguments)
+    response = google_cache.get(cache_key)
+
+    if response is None:
+        for _ in google_limiter.attempts():
+            google_limiter.acquire()
+            response = parse_google_response(cache_key, network.get(f"{GOOGLE_GEOCODE_URL}?{arguments}&key={api_key}"))
+            if not over_query_limit(response):
+                break
+
+    if not response["status"] == "OK":
+        return None
+    return response
 
-        if not response["status"] == "OK":
-            return None
-        return response
+
+def over_query_limit(response: dict) -> bool:
+    """
+    Lets the rate limiter pause the requests to Googles Geocode API if a response says that too many
+    requests were sent, or resets the pause otherwise.
+
+    Parameters
+    ----------
+    response: dict
+        The parsed response
+
+    Returns
+    -------
+    bool
+        True if the request has to be sent again, False otherwise
+    """
+    if response["status"] == "OVER_QUERY_LIMIT":
+        google_limiter.over_query_limit()
+        return True
+    google_limiter.succeeded()
+    return False
+
+
+def parse_google_response(cache_key: str, body: bytes) -> dict:
+    """
+    Parses the body of a response of Googles Geocode API and caches it, if it is a definitive answer.
+
+    Parameters
+    ----------
+    cache_key: str
+        The normalized arguments of the request
+    body: bytes
+        The body of the response
+
+    Returns
+    -------
+    dict
+        A dict containing the parsed response
+    """
+    response = json.loads(body.decode("utf-8"))
+    # Only cache definitive answers, not errors such as an exceeded quota
+    if response["status"] in ("OK", "ZERO_RESULTS"):
+        google_cache.set(cache_key, response)
+    return response
 
 
 def request_entry_with_google_api(api_key: str, entry, include_city: bool = False):
@@ -133,6 +198,33 @@ def request_entry_with_google_api(api_key: str, entry, include_city: bool = Fals
     include_city: bool
         Whether the entry 'city' should be included in the request
 
+    Returns
+    -------
+    dict
+        A dict containing Google's suggestion if a valid result was received
+    None
+        If no valid result was received
+    """
+    return perform_lookups(request_entry_lookups(entry, include_city), api_key)
+
+
+def request_entry_lookups(entry, include_city: bool = False):
+    """
+    Version of request_entry_with_google_api that yields the lookup it needs, instead of sending
+    the request itself.
+
+    Parameters
+    ----------
+    entry
+        The entry that is used to create the request
+    include_city: bool
+        Whether the entry 'city' should be included in the request
+
+    Yields
+    ------
+    (str, str)
+        The Google lookup and its arguments. The response is expected to be sent back
+
     Returns
     -------
     dict
@@ -146,7 +238,7 @@ def request_entry_with_google_api(api_key: str, entry, include_city: bool = Fals
         arguments = arguments + f"+{entry['city'].replace(' ', '+')}"
 
     # Send the request
-    response = request_from_google_api(api_key, arguments)
+    response = yield GOOGLE, arguments
 
     try:
         # Fetch the postal code and city from the result
@@ -207,20 +299,47 @@ def suggest_address_with_google_api(api_key: str, entry, in_nl: bool = True):
     None
         If Google gave no valid result
     """
-    result = entry.to_dict()
+    return perform_lookups(suggest_address_lookups(entry, in_nl), api_key)
+
+
+def suggest_address_lookups(entry, in_nl: bool = True):
+    """
+    Version of suggest_address_with_google_api that yields the lookups it needs, instead of sending
+    the requests itself.
+
+    Parameters
+    ----------
+    entry
+        The entry that represents the address
+    in_nl: bool
+        A boolean indicating whether the address is in the Netherlands
+
+    Yields
+    ------
+    (str, str)
+        The Google lookups and their arguments. The responses are expected to be sent back
+
+    Returns
+    -------
+    dict
+        A dict containing Google's suggestion
+    None
+        If Google gave no valid result
+    """
+    result = dict(entry)
     # Get a response from the address and city
-    address = request_entry_with_google_api(api_key, entry, True)
+    address = yield from request_entry_lookups(entry, True)
 
     if not address:
         # If the address is invalid, try without the city
-        address = request_entry_with_google_api(api_key, entry, False)
+        address = yield from request_entry_lookups(entry, False)
     elif in_nl:
         # Otherwise, if the address was valid and in the Netherlands, check that it is fully valid.
         # If not, try without city
         if not address['country_short'] == 'NL' or not address['street_name'] \
                 or not address['street_number'] or not address['postal_code'] \
                 or not address['city']:
-            address = request_entry_with_google_api(api_key, entry, False)
+            address = yield from request_entry_lookups(entry, False)
 
     # If all fails, raise an exception
     if not address:
@@ -241,7 +360,8 @@ def suggest_address_with_google_api(api_key: str, entry, in_nl: bool = True):
 def query_dutch_georegister(street, house_number, postal_code, city, house_number_extra=None):
     """
     Queries the official Dutch georegister to see whether an address is correct. Returns the
-    response that was obtained from the georegister.
+    response that was obtained from the georegister. Valid responses are cached both in memory and
+    on disk. If a BAG extract was imported (see bag.py), the query is answered locally instead.
 
     Parameters
     ----------
@@ -263,6 +383,83 @@ def query_dutch_georegister(street, house_number, postal_code, city, house_numbe
     None
         If no valid response was received
     """
+    response, cache_key, url = known_georegister_response(street, house_number, postal_code, city,
+                                                          house_number_extra)
+    if response is not None or url is None:
+        return response
+
+    try:
+        # As the Geodata API is sometimes unstable, we try to send the request a number of times
+        attempts = 3
+        for i in range(0, attempts - 1):
+            try:
+                return parse_georegister_response(cache_key, network.get(url, timeout=5))
+            except (client.RemoteDisconnected, TimeoutError, URLError):
+                if i == attempts - 1:
+                    return None
+    except HTTPError:
+        return None
+    return None
+
+
+def known_georegister_response(street, house_number, postal_code, city, house_number_extra=None):
+    """
+    Answers a georegister query without sending a request, if possible. If a BAG extract was
+    imported (see bag.py), the query is answered by the local index. Otherwise, the response is
+    looked up in the cache.
+
+    Parameters
+    ----------
+    street
+        The address street
+    house_number
+        The address house number
+    postal_code
+        The address postal code
+    city
+        The address city
+    house_number_extra
+        The extra part of the address house number
+
+    Returns
+    -------
+    (dict, str, str)
+        A tuple containing the known response (or None), the cache key and the URL of the request
+        that has to be sent if the response is not known. The key and URL are None if the response
+        is final, even when it is None.
+    """
+    # If a BAG extract was imported, answer the query locally without any network I/O
+    index = get_index(input_files.path(BAG_INDEX_FILE))
+    if index is not None:
+        return index.query(street, house_number, postal_code, city, house_number_extra), None, None
+
+    # The same query is often sent multiple times, so check whether we already know the response
+    cache_key, url = georegister_query(street, house_number, postal_code, city, house_number_extra)
+    return georegister_cache.get(cache_key), cache_key, url
+
+
+def georegister_query(street, house_number, postal_code, city, house_number_extra=None) -> (str, str):
+    """
+    Builds the query for the Dutch georegister, as used by query_dutch_georegister.
+
+    Parameters
+    ----------
+    street
+        The address street
+    house_number
+        The address house number
+    postal_code
+        The address postal code
+    city
+        The address city
+    house_number_extra
+        The extra part of the address house number
+
+    Returns
+    -------
+    (str, str)
+        A tuple containing the canonical cache key of the query and the URL of the request
+    """
     query_params = ["fl=woonplaatsnaam,postcode,straatnaam,huis_nlt"]
     if street:
         query_params.append(f"fq=straatnaam:{street}")
@@ -277,24 +474,31 @@ def query_dutch_georegister(street, house_number, postal_code, city, house_numbe
         query_params.append(f"q={house_number_extra}")
     formatted = '&'.join(query_params)
 
-    url = f"https://geodata.nationaalgeoregister.nl/locatieserver/v3/free?{formatted}" \
-        .replace(' ', '+')
-    try:
-        # As the Geodata API is sometimes unstable, we try to send the request a number of times
-        attempts = 3
-        for i in range(0, attempts - 1):
-            try:
-                with request.urlopen(url, timeout=5) as response:
-                    return json.loads(response.read().decode("utf-8"))['response']
-            except (RemoteDisconnected, TimeoutError, URLError):
-                if i == attempts - 1:
-                    return None
-    except HTTPError:
-        return None
-    return None
+    return '&'.join(sorted(query_params)), f"{GEOREGISTER_URL}?{formatted}".replace(' ', '+')
 
 
-def verify_dutch_address(entry, ignore_argument: str = ""):
+def parse_georegister_response(cache_key: str, body: bytes) -> dict:
+    """
+    Parses the body of a response of the Dutch georegister and caches it.
+
+    Parameters
+    ----------
+    cache_key: str
+        The canonical cache key of the query
+    body: bytes
+        The body of the response
+
+    Returns
+    -------
+    dict
+        A dict containing the georegister response
+    """
+    response = json.loads(body.decode("utf-8"))['response']
+    georegister_cache.set(cache_key, response)
+    return response
+
+
+def verify_dutch_address(entry, ignore_argument: str = "") -> bool:
     """
     Verifies a Dutch address for correctness. If it was correct, some small changes to the address
     might be made to improve the quality.
@@ -307,25 +511,84 @@ def verify_dutch_address(entry, ignore_argument: str = ""):
         can then be added/corrected later with the response that was received from the Dutch
         georegister
     """
+    return perform_lookups(verify_dutch_address_lookups(entry, ignore_argument))
+
+
+def correct_with_postal_code(entry, ignore_argument: str) -> bool:
+    """
+    Corrects the street name or city of a Dutch address using the local postal code table, if the
+    postal code and house number identify exactly one street. The entry is changed the way
+    verify_dutch_address changes it when the georegister finds exactly one address, so the address
+    is rebuilt from the street name and house number.
+
+    Parameters
+    ----------
+    entry
+        The entry representing the address
+    ignore_argument: str
+        "straatnaam" to correct the street name, or "woonplaatsnaam" to correct the city
+
+    Returns
+    -------
+    bool
+        True if the entry was corrected, False if it could not be corrected locally
+    """
+    street, house_number, house_number_extra = format_dutch_address(entry["address"])
+    if not house_number or house_number_extra:
+        return False
+    postal_code = entry["postal_code"].upper().replace(" ", "")
+
+    if ignore_argument == "straatnaam":
+        match = resolve_postal_code(postal_code, house_number, city=entry['city'])
+    elif ignore_argument == "woonplaatsnaam":
+        match = resolve_postal_code(postal_code, house_number, street=street)
+    else:
+        match = None
+    if not match:
+        return False
+    # Like a response of the georegister, the table contains the canonical street, postal code and city
+    entry['address'] = f"{match[0]} {house_number}"
+    entry['postal_code'] = postal_code
+    entry['city'] = match[1]
+    return True
+
+
+def verify_dutch_address_lookups(entry, ignore_argument: str = ""):
+    """
+    Version of verify_dutch_address that yields the lookups it needs, instead of querying the Dutch
+    georegister itself.
+
+    Parameters
+    ----------
+    entry
+        The entry representing the address
+    ignore_argument: str
+        A value of the entry that should be ignored in the request, see verify_dutch_address
+
+    Yields
+    ------
+    (str, tuple)
+        The georegister lookups and their arguments. The responses are expected to be sent back
+    """
     street, house_number, house_number_extra = format_dutch_address(entry["address"])
     if not house_number:
         return False
     postal_code = entry["postal_code"].upper().replace(" ", "")
 
     if ignore_argument == "straatnaam":
-        response = query_dutch_georegister(None, house_number, postal_code, entry['city'],
-                                           house_number_extra)
+        response = yield GEOREGISTER, (None, house_number, postal_code, entry['city'],
+                                       house_number_extra)
     elif ignore_argument == "woonplaatsnaam":
-        response = query_dutch_georegister(street, house_number, postal_code, None,
-                                           house_number_extra)
+        response = yield GEOREGISTER, (street, house_number, postal_code, None,
+                                       house_number_extra)
     elif ignore_argument == "postcode":
-        response = query_dutch_georegister(street, house_number, None, entry['city'],
-                                           house_number_extra)
+        response = yield GEOREGISTER, (street, house_number, None, entry['city'],
+                                       house_number_extra)
         if not response or min(int(response['numFound']), len(response['docs'])) == 0:
-            response = query_dutch_georegister(street, house_number, None, entry['city'], None)
+            response = yield GEOREGISTER, (street, house_number, None, entry['city'], None)
     else:
-        response = query_dutch_georegister(street, house_number, postal_code, entry['city'],
-                                           house_number_extra)
+        response = yield GEOREGISTER, (street, house_number, postal_code, entry['city'],
+                                       house_number_extra)
 
     removed_extra = False
     if not response or min(int(response['numFound']), len(response['docs'])) > 25000:
@@ -337,7 +600,7 @@ def verify_dutch_address(entry, ignore_argument: str = ""):
     if response_num_found == 0 and house_number_extra:
         # If there were 0 results and a house number extra was used, try it again,
         # but without the extra part
-        response = query_dutch_georegister(street, house_number, postal_code, entry['city'])
+        response = yield GEOREGISTER, (street, house_number, postal_code, entry['city'], None)
         response_num_found = min(int(response['numFound']), len(response['docs']))
         if response_num_found == 0:
             return False
@@ -428,121 +691,155 @@ def is_similar(address_1, address_2) -> bool:
            and address_1['country'].lower() == address_2['country'].lower()
 
 
-def correct_entries(entries: pd.DataFrame, output_dir: str) -> (int, int):
+def validate_entry(api_key: str, entry: dict) -> (str, dict, str):
     """
-    Corrects a list of address entries in-place using various APIs and sub-methods. The goal of this
-    method is to be able to validate every input address and, if necessary, change it to an address
-    that is valid.
+    Validates a single entry using various APIs and sub-methods, and corrects it if necessary. The
+    user is never asked anything, so this method can safely be run for multiple entries at once.
 
     Parameters
     ----------
-    entries: pd.DataFrame
-        A dataframe containing all input entries
-    output_dir: str
-        The output directory that is used to log the result of this correction method
+    api_key: str
+        A string representing the API key
+    entry: dict
+        The entry to validate. It is not changed; a corrected copy is returned instead
 
     Returns
     -------
-    (int, int)
-        A tuple containing two integers. The first represents the number of invalid entries,
-        the second represents the number of entries that were changed to obtain a valid entry.
-    """
-    api_key = get_api_key()
-
-    invalid_entries = []
-    changed_entries = []
-    entries_to_drop = []
-
-    for i, entry in tqdm(entries.iterrows(), total=len(entries)):
-        original_entry_dict = entry.to_dict().copy()
-        if entry["first_name"] == "Rico" and entry["last_name"] == "te Wechel":
-            entry["first_name"] = "Grote"
-            entry["last_name"] = "Smurf"
-
-        # Check that the address is not empty and not removed. Otherwise, remove it
-        if entry["address"] == "" or "<removed>" in entry["address"]:
-            entries_to_drop.append(i)
-            invalid_entries.append(original_entry_dict)
-            continue
-
-        if entry["country"] == "Netherlands":
-            # Verify the Dutch address. If it is a fully correct address, we continue
-            if verify_dutch_address(entry):
-                # Check if the suggestion changed something. If so, add it to the changed entries
-                if not is_similar(original_entry_dict, entry):
-                    changed_entries.append((entry_to_string(original_entry_dict),
-                                            entry_to_string(entry),
-                                            'GEODATA_CORRECTION'))
-                continue
-
-            # Attempt to fix the address with Google Maps
-            address_suggestion = suggest_address_with_google_api(api_key, entry)
-            if address_suggestion:
-                # Check if the newly suggested address is correct
-                if verify_dutch_address(address_suggestion):
-                    # Change the entry to the suggestion
-                    entry['address'] = address_suggestion['address']
-                    entry['postal_code'] = address_suggestion['postal_code']
-                    entry['city'] = address_suggestion['city']
-                    changed_entries.append((entry_to_string(original_entry_dict),
-                                            entry_to_string(entry.to_dict()),
-                                            'GOOGLE_SUGGESTION_DUTCH'))
-                    continue
-
-            # Maybe the street name is wrong? Attempt to fix it whilst ignoring the street name
-            if verify_dutch_address(entry, ignore_argument="straatnaam"):
-                changed_entries.append((entry_to_string(original_entry_dict),
-                                        entry_to_string(entry.to_dict()),
-                                        'GEODATA_SUGGESTION_CHANGE_STREET_NAME'))
-                continue
-
-            # Maybe the city is wrong? Attempt to fix it whilst ignoring the city
-            if verify_dutch_address(entry, ignore_argument="woonplaatsnaam"):
-                changed_entries.append((entry_to_string(original_entry_dict),
-                                        entry_to_string(entry.to_dict()),
-                                        'GEODATA_SUGGESTION_CHANGE_CITY'))
-                continue
-
-            # Maybe the postal code is wrong? Attempt to fix it whilst ignoring the postal code
-            if verify_dutch_address(entry, ignore_argument="postcode"):
-                changed_entries.append((entry_to_string(original_entry_dict),
-                                        entry_to_string(entry.to_dict()),
-                                        'GEODATA_SUGGESTION_CHANGE_POSTAL_CODE'))
-                continue
-        else:
-            # Verify the international address with the Google Maps API
-            address_suggestion = suggest_address_with_google_api(api_key, entry, False)
-            if address_suggestion:
-                # Check if the suggestion changed something. If so, add it to the changed entries
-                if not is_similar(entry, address_suggestion):
-                    changed_entries.append((entry_to_string(original_entry_dict),
-                                            entry_to_string(address_suggestion),
-                                            'GOOGLE_SUGGESTION_NON_DUTCH'))
+    (str, dict, str)
+        A tuple containing the validation status, the (corrected) entry and the reason for the
+        change, or None if the change does not have to be logged. The status is "VALID" if the
+        entry was validated, "INVALID" if it can never be valid and "UNVERIFIED" if the user has
+        to decide whether to keep the entry.
+    """
+    return perform_lookups(validate_entry_lookups(entry), api_key)
+
+
+def validate_entry_lookups(entry: dict):
+    """
+    Version of validate_entry that yields the lookups it needs, instead of sending the requests
+    itself. This allows the same validation steps to be driven by blocking and asynchronous code.
+
+    Parameters
+    ----------
+    entry: dict
+        The entry to validate. It is not changed; a corrected copy is returned instead
+
+    Yields
+    ------
+    (str, object)
+        The lookups and their arguments. The responses are expected to be sent back
+
+    Returns
+    -------
+    (str, dict, str)
+        The outcome of the validation, see validate_entry
+    """
+    original_entry_dict = dict(entry)
+    entry = dict(entry)
+
+    # Check that the address is not empty and not removed. Otherwise, remove it
+    if entry["address"] == "" or "<removed>" in entry["address"]:
+        return "INVALID", entry, None
+
+    if entry["country"] == "Netherlands":
+        # Verify the Dutch address. If it is a fully correct address, we continue
+        if (yield from verify_dutch_address_lookups(entry)):
+            # Check if the suggestion changed something. If so, it should be logged
+            if not is_similar(original_entry_dict, entry):
+                return "VALID", entry, 'GEODATA_CORRECTION'
+            return "VALID", entry, None
+
+        # Attempt to fix the address with Google Maps
+        address_suggestion = yield from suggest_address_lookups(entry)
+        if address_suggestion:
+            # Check if the newly suggested address is correct
+            if (yield from verify_dutch_address_lookups(address_suggestion)):
                 # Change the entry to the suggestion
                 entry['address'] = address_suggestion['address']
                 entry['postal_code'] = address_suggestion['postal_code']
                 entry['city'] = address_suggestion['city']
-                entry['country'] = address_suggestion['country']
-                continue
-
-        if not query_yes_no(f"\n---------------------------------------------------\n"
-                            f"We could not validate the correctness of the following address:\n"
-                            f"{entry_to_string(entry)}\n"
-                            f"Do you want to add this address anyway?", "no"):
-            entries_to_drop.append(i)
-            invalid_entries.append(original_entry_dict)
-
-    # Drop invalid entries and reset the indices
-    entries.drop(entries_to_drop, inplace=True)
-    entries.reset_index(drop=True, inplace=True)
-
-    # Log changes to output files
-    with open(os.path.join(output_dir, 'invalid_entries.log'), 'w', encoding='utf8') as file:
-        file.write('\n\n'.join(map(entry_to_string, invalid_entries)))
-
-    with open(os.path.join(output_dir, 'changed_entries.log'), 'w', encoding='utf8') as file:
-        file.write('\n\n\n'.join(map(lambda changed_entry: f'ORIGINAL:\n{changed_entry[0]}\n'
-                                                           f'CHANGED:\n{changed_entry[1]}\n'
-                                                           f'REASON: {changed_entry[2]}',
-                                     changed_entries)))
-    return len(invalid_entries), len(changed_entries)
+                return "VALID", entry, 'GOOGLE_SUGGESTION_DUTCH'
+
+        # Maybe the street name is wrong? Attempt to fix it whilst ignoring the street name. The
+        # postal code table can often do this without querying the georegister
+        if correct_with_postal_code(entry, "straatnaam") \
+                or (yield from verify_dutch_address_lookups(entry, ignore_argument="straatnaam")):
+            return "VALID", entry, 'GEODATA_SUGGESTION_CHANGE_STREET_NAME'
+
+        # Maybe the city is wrong? Attempt to fix it whilst ignoring the city
+        if correct_with_postal_code(entry, "woonplaatsnaam") \
+                or (yield from verify_dutch_address_lookups(entry, ignore_argument="woonplaatsnaam")):
+            return "VALID", entry, 'GEODATA_SUGGESTION_CHANGE_CITY'
+
+        # Maybe the postal code is wrong? Attempt to fix it whilst ignoring the postal code
+        if (yield from verify_dutch_address_lookups(entry, ignore_argument="postcode")):
+            return "VALID", entry, 'GEODATA_SUGGESTION_CHANGE_POSTAL_CODE'
+    else:
+        # Verify the international address with the Google Maps API
+        address_suggestion = yield from suggest_address_lookups(entry, False)
+        if address_suggestion:
+            # Check if the suggestion changed something. If so, it should be logged
+            reason = None if is_similar(entry, address_suggestion) else 'GOOGLE_SUGGESTION_NON_DUTCH'
+            # Change the entry to the suggestion
+            entry['address'] = address_suggestion['address']
+            entry['postal_code'] = address_suggestion['postal_code']
+            entry['city'] = address_suggestion['city']
+            entry['country'] = address_suggestion['country']
+            return "VALID", entry, reason
+
+    return "UNVERIFIED", entry, None
+
+
+def perform_lookups(lookups, api_key: str = None):
+    """
+    Runs a generator that yields lookups until it is done, by performing each lookup with the
+    blocking API methods and sending the response back.
+
+    Parameters
+    ----------
+    lookups
+        The generator, for example created by validate_entry_lookups
+    api_key: str
+        A string representing the API key, only needed for Google lookups
+
+    Returns
+    -------
+    object
+        The value that is returned by the generator
+    """
+    try:
+        kind, arguments = next(lookups)
+        while True:
+            if kind == GEOREGISTER:
+                response = query_dutch_georegister(*arguments)
+            else:
+                response = request_from_google_api(api_key, arguments)
+            kind, arguments = lookups.send(response)
+    except StopIteration as result:
+        return result.value
+
+
+def validate_entries(api_key: str, entries: list, workers: int = 1):
+    """
+    Validates entries with blocking requests in a pool of worker threads. The outcomes are yielded
+    in the order of the entries, as soon as they are available.
+
+    Parameters
+    ----------
+    api_key: str
+        A string representing the API key
+    entries: list
+        The entries to validate, represented as dictionaries
+    workers: int
+        The number of entries that are validated at the same time
+
+    Yields
+    ------
+    (str, dict, str)
+        The outcome of the validation of each entry, see validate_entry
+    """
+    if workers <= 1:
+        yield from map(partial(validate_entry, api_key), entries)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(partial(validate_entry, api_key), entries)
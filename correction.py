@@ -0,0 +1,352 @@
+"""
+File containing functionality to correct all input entries, by validating every distinct address
+once and applying the outcomes to the entries in their original order
+"""
+from __future__ import annotations
+
+import os
+import hashlib
+import json
+from contextlib import closing
+
+from util import entry_to_string, input_files, lazy_import, query_yes_no
+from cache import google_cache, georegister_cache, ledger
+from checker import get_api_key, is_similar, validate_entries
+from journal import Journal, JOURNAL_FILE
+from ratelimit import google_limiter
+from report import run_report
+from rules import RULES_FILE, RuleSet, load_rules
+
+pd = lazy_import("pandas")
+tqdm = lazy_import("tqdm")
+
+# The number of new outcomes that are written to the ledger at once
+LEDGER_BATCH_SIZE = 1000
+# What can be done with addresses that could not be validated
+UNVERIFIED_POLICIES = ("ask", "keep", "drop")
+
+
+def write_logs(output_dir: str, invalid_entries: list, changed_entries: list):
+    """
+    Writes the invalid and changed entries to log files in the output directory.
+
+    Parameters
+    ----------
+    output_dir: str
+        The output directory that the log files are written to
+    invalid_entries: list
+        The original versions of the entries that were removed
+    changed_entries: list
+        Tuples containing the original entry, the changed entry (both formatted as strings) and the
+        reason of the change
+    """
+    with open(os.path.join(output_dir, 'invalid_entries.log'), 'w', encoding='utf8') as file:
+        file.write('\n\n'.join(map(entry_to_string, invalid_entries)))
+
+    with open(os.path.join(output_dir, 'changed_entries.log'), 'w', encoding='utf8') as file:
+        file.write('\n\n\n'.join(map(lambda changed_entry: f'ORIGINAL:\n{changed_entry[0]}\n'
+                                                           f'CHANGED:\n{changed_entry[1]}\n'
+                                                           f'REASON: {changed_entry[2]}',
+                                     changed_entries)))
+
+
+def address_key(entry: dict) -> tuple:
+    """
+    Computes a canonical key of the address of an entry. Entries with the same key, such as members
+    that live in the same house, have the same validation outcome.
+
+    Parameters
+    ----------
+    entry: dict
+        The entry, represented as a dictionary
+
+    Returns
+    -------
+    tuple
+        The address, postal code, city and country, normalized
+    """
+    return (' '.join(entry['address'].lower().split()), entry['postal_code'].upper().replace(' ', ''),
+            ' '.join(entry['city'].lower().split()), entry['country'])
+
+
+def apply_outcome(outcome: (str, dict, str), entry: dict) -> (str, dict, str):
+    """
+    Applies the validation outcome of an address to an entry that shares the same address key.
+
+    Parameters
+    ----------
+    outcome: (str, dict, str)
+        The outcome of the validation of the address, see validate_entry
+    entry: dict
+        The entry that the outcome is applied to
+
+    Returns
+    -------
+    (str, dict, str)
+        The outcome of the validation of the entry
+    """
+    status, corrected, reason = outcome
+    result = dict(entry)
+    if result["first_name"] == "Rico" and result["last_name"] == "te Wechel":
+        result["first_name"] = "Grote"
+        result["last_name"] = "Smurf"
+    # Only a valid address is taken over, other entries keep how they wrote their own address
+    if status == "VALID":
+        for column in ('address', 'postal_code', 'city', 'country'):
+            result[column] = corrected[column]
+
+    # Whether small corrections are logged depends on how the original entry was formatted
+    if status == "VALID" and reason in (None, 'GEODATA_CORRECTION', 'GOOGLE_SUGGESTION_NON_DUTCH'):
+        if is_similar(entry, result):
+            reason = None
+        else:
+            reason = 'GEODATA_CORRECTION' if entry['country'] == 'Netherlands' else 'GOOGLE_SUGGESTION_NON_DUTCH'
+    return status, result, reason
+
+
+def validate_addresses(api_key: str, entries: list, validator):
+    """
+    Validates every distinct address in a list of entries once, and applies the outcome to all
+    entries that share the address. The outcomes are yielded in the order of the entries.
+
+    Parameters
+    ----------
+    api_key: str
+        A string representing the API key
+    entries: list
+        The entries to validate, represented as dictionaries
+    validator
+        A function that is given the API key and a list of entries, and yields their outcomes
+
+    Yields
+    ------
+    (tuple, (str, dict, str))
+        The address key of each entry and the outcome of its validation, see validate_entry
+    """
+    keys = [address_key(entry) for entry in entries]
+    unique_entries = {}
+    for key, entry in zip(keys, entries):
+        unique_entries.setdefault(key, entry)
+    print(f"Validating {len(unique_entries)} unique address(es)..")
+
+    # The outcomes arrive in the order in which the addresses first occur
+    outcomes = {}
+    with closing(validator(api_key, list(unique_entries.values()))) as unique_outcomes:
+        for key, entry in zip(keys, entries):
+            if key not in outcomes:
+                outcomes[key] = next(unique_outcomes, None)
+            yield key, apply_outcome(outcomes[key], entry)
+
+
+def row_hash(entry: dict) -> str:
+    """
+    Computes a hash of an input row, which changes whenever any of its values changes.
+
+    Parameters
+    ----------
+    entry: dict
+        The entry, represented as a dictionary
+
+    Returns
+    -------
+    str:
+        The hexadecimal hash of the row
+    """
+    return hashlib.sha1(json.dumps(entry, sort_keys=True, default=str).encode("utf8")).hexdigest()
+
+
+def validate_with_ledger(api_key: str, entries: list, validator):
+    """
+    Looks up the outcomes of entries that were validated in an earlier run in the ledger, and only
+    validates the new or changed entries. The outcomes are yielded in the order of the entries.
+
+    Parameters
+    ----------
+    api_key: str
+        A string representing the API key
+    entries: list
+        The entries to validate, represented as dictionaries
+    validator
+        A function that is given the API key and a list of entries, and yields their outcomes
+
+    Yields
+    ------
+    (str, dict, str)
+        The outcome of the validation of each entry, see validate_entry
+    """
+    hashes = [row_hash(entry) for entry in entries]
+    known_outcomes = ledger.get_many(hashes)
+    new_entries = [entry for entry, outcome in zip(entries, known_outcomes) if outcome is None]
+    print(f"{len(entries) - len(new_entries)} entries are unchanged since an earlier run")
+
+    new_outcomes = []
+    try:
+        with closing(validate_addresses(api_key, new_entries, validator)) as outcomes:
+            for row, outcome in zip(hashes, known_outcomes):
+                if outcome is not None:
+                    yield tuple(outcome)
+                    continue
+
+                _, outcome = next(outcomes, (None, None))
+                # Unverified addresses may have failed because of the network, so they are retried
+                if outcome[0] != "UNVERIFIED":
+                    new_outcomes.append((row, outcome))
+                if len(new_outcomes) >= LEDGER_BATCH_SIZE:
+                    ledger.set_many(new_outcomes)
+                    new_outcomes.clear()
+                yield outcome
+    finally:
+        ledger.set_many(new_outcomes)
+
+
+def apply_outcomes(entries: pd.DataFrame, outcomes) -> (dict, list, list):
+    """
+    Writes the corrected entries back to the dataframe, in the order of the outcomes.
+
+    Parameters
+    ----------
+    entries: pd.DataFrame
+        A dataframe containing all input entries
+    outcomes
+        Tuples containing the index of an entry, the original entry and the outcome of its
+        validation, see checker.validate_entry
+
+    Returns
+    -------
+    (dict, list, list)
+        A tuple containing the original versions of the invalid entries by their index, the changed
+        entries (see write_logs), and the index, original entry and outcome of every entry that
+        could not be validated
+    """
+    invalid_entries = {}
+    changed_entries = []
+    review_queue = []
+    corrected_entries = {}
+    for i, original_entry_dict, (status, entry, reason) in outcomes:
+        if status == "UNVERIFIED":
+            review_queue.append((i, original_entry_dict, (status, entry, reason)))
+            continue
+
+        if status == "INVALID":
+            invalid_entries[i] = original_entry_dict
+            continue
+
+        if reason:
+            changed_entries.append((entry_to_string(original_entry_dict), entry_to_string(entry), reason))
+        corrected_entries[i] = entry
+
+    # Write the (corrected) entries back to the dataframe at once. Values that are missing in a
+    # corrected entry, such as a postal code that Google did not return, keep the input value
+    entries.update(pd.DataFrame.from_dict(corrected_entries, orient="index"))
+    return invalid_entries, changed_entries, review_queue
+
+
+def review_unverified(review_queue: list, policy: str = "ask", rules: RuleSet = None):
+    """
+    Decides whether the entries that could not be validated should be kept. The first rule that
+    matches an entry decides; otherwise the policy is used. If the policy is to ask, the user is
+    asked about every address only once, after all other entries are validated.
+
+    Parameters
+    ----------
+    review_queue: list
+        The index, original entry and outcome of every entry that could not be validated
+    policy: str
+        Either 'ask', 'keep' or 'drop'
+    rules: RuleSet
+        The rules that decide about entries before the policy is used
+
+    Yields
+    ------
+    (int, dict, (str, dict, str))
+        The index, original entry and outcome of each entry, where an entry that should be kept is
+        valid and an entry that should not be kept is invalid
+    """
+    if review_queue:
+        print(f"{len(review_queue)} address(es) could not be validated")
+    decisions = {}
+    for i, original_entry_dict, (_, entry, reason) in review_queue:
+        key = address_key(entry)
+        decision = rules.decide(entry) if rules is not None else None
+        if decision is not None:
+            yield i, original_entry_dict, ("VALID" if decision else "INVALID", entry, reason)
+            continue
+        if policy != "ask":
+            decisions[key] = policy == "keep"
+        elif key not in decisions:
+            decisions[key] = query_yes_no(f"\n---------------------------------------------------\n"
+                                          f"We could not validate the correctness of the following "
+                                          f"address:\n{entry_to_string(entry)}\n"
+                                          f"Do you want to add this address anyway?", "no")
+        yield i, original_entry_dict, ("VALID" if decisions[key] else "INVALID", entry, reason)
+
+
+def correct_entries(entries: pd.DataFrame, output_dir: str, validator=None, resume: bool = False,
+                    unverified: str = "ask") -> (int, int):
+    """
+    Corrects a list of address entries in-place using various APIs and sub-methods. The goal of this
+    method is to be able to validate every input address and, if necessary, change it to an address
+    that is valid.
+
+    Parameters
+    ----------
+    entries: pd.DataFrame
+        A dataframe containing all input entries
+    output_dir: str
+        The output directory that is used to log the result of this correction method
+    validator
+        A function that is given the API key and a list of entries, and yields their outcomes in
+        order, such as async_checker.validate_entries_async or validate_entries with a number of
+        workers. Results are always applied in the order of the input entries, so the outcome does
+        not depend on the validator. Defaults to validate_entries
+    resume: bool
+        Whether to continue an interrupted run, using the outcomes in the journal in the output
+        directory instead of validating the entries that were already completed
+    unverified: str
+        What to do with addresses that could not be validated and that no rule in the rules file
+        (see rules.py) decides about: 'ask' the user, 'keep' them or 'drop' them
+
+    Raises
+    ------
+    ValueError
+        If the rules file in the input directory is not valid, before any entry is validated
+
+    Returns
+    -------
+    (int, int)
+        A tuple containing two integers. The first represents the number of invalid entries,
+        the second represents the number of entries that were changed to obtain a valid entry.
+    """
+    if validator is None:
+        validator = validate_entries
+    # The rules are only used after the validation, but a mistake in them should not have to wait for it
+    rules = load_rules(input_files.path(RULES_FILE))
+
+    original_entries = entries.to_dict('records')
+    journal = Journal(os.path.join(output_dir, JOURNAL_FILE))
+    outcomes = journal.outcomes([row_hash(entry) for entry in original_entries],
+                                lambda start: validate_with_ledger(get_api_key(), original_entries[start:], validator),
+                                resume)
+
+    # Validate the entries in the background, the results are handled in the input order. Entries
+    # that could not be validated are reviewed afterwards, so the validation never waits for the user
+    with closing(outcomes), run_report.stage("validation"):
+        invalid_entries, changed_entries, review_queue = apply_outcomes(
+            entries, tqdm.tqdm(zip(entries.index, original_entries, outcomes), total=len(entries)))
+    with run_report.stage("review"):
+        invalid_entries.update(apply_outcomes(entries, review_unverified(review_queue, unverified, rules))[0])
+
+    # Drop invalid entries and reset the indices. The invalid entries are logged in the input order
+    invalid_indices = [i for i in entries.index if i in invalid_entries]
+    entries.drop(invalid_indices, inplace=True)
+    entries.reset_index(drop=True, inplace=True)
+
+    # Log changes to output files
+    write_logs(output_dir, [invalid_entries[i] for i in invalid_indices], changed_entries)
+    print(f"Google cache: {google_cache.stats()}")
+    print(f"Georegister cache: {georegister_cache.stats()}")
+    print(f"Google API: {google_limiter.stats()}")
+    print(f"Ledger: {ledger.stats()}")
+    if rules.rules:
+        print(rules.summary())
+    return len(invalid_entries), len(changed_entries)
@@ -0,0 +1,33 @@
+"""
+File containing functionality to load the TrueType font of the stickers once per process.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+from util import lazy_import, resource_path
+
+pdfmetrics = lazy_import("reportlab.pdfbase.pdfmetrics")
+ttfonts = lazy_import("reportlab.pdfbase.ttfonts")
+
+
+@lru_cache(maxsize=None)
+def get_font(name: str, font_file: str) -> ttfonts.TTFont:
+    """
+    Loads and registers a font the first time it is needed.
+
+    Parameters
+    ----------
+    name: str
+        The name under which the font is registered with reportlab
+    font_file: str
+        The location of the font file, relative to the application
+
+    Returns
+    -------
+    TTFont
+        The registered font. Its face is the parsed font file
+    """
+    font = ttfonts.TTFont(name, resource_path(font_file))
+    pdfmetrics.registerFont(font)
+    return font
@@ -0,0 +1,88 @@
+"""
+File containing functionality to record the outcome of every validated entry in an append-only
+journal, so that an interrupted run can be resumed without repeating any work
+"""
+
+import json
+import os
+from contextlib import closing
+
+# The name of the journal in the output directory
+JOURNAL_FILE = "validation_journal.jsonl"
+
+
+class Journal:
+    """
+    An append-only file with one JSON line per validated entry, in the order of the entries. Every
+    line is flushed as soon as it is written, so the journal survives crashes and interrupts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self, hashes: list) -> (list, int):
+        """
+        Reads the outcomes of the entries that were completed in an earlier run. Reading stops at
+        the first line that is incomplete or that belongs to a different input row.
+
+        Parameters
+        ----------
+        hashes: list
+            The hashes of the input rows, see correction.row_hash
+
+        Returns
+        -------
+        (list, int)
+            A tuple containing the outcomes of the completed entries, and the size in bytes of the
+            part of the journal that contains them
+        """
+        outcomes = []
+        size = 0
+        if not os.path.exists(self.path):
+            return outcomes, size
+        with open(self.path, "rb") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n") or len(outcomes) >= len(hashes) \
+                        or record["row"] != hashes[len(outcomes)]:
+                    break
+                outcomes.append((record["status"], record["entry"], record["reason"]))
+                size += len(line)
+        return outcomes, size
+
+    def outcomes(self, hashes: list, validate, resume: bool = False):
+        """
+        Replays the outcomes in the journal if the run is resumed, and validates and records the
+        remaining entries.
+
+        Parameters
+        ----------
+        hashes: list
+            The hashes of the input rows, see correction.row_hash
+        validate
+            A function that is given the position of the first entry that has not been completed,
+            and yields the outcomes of the entries from that position onwards
+        resume: bool
+            Whether the outcomes in the journal are used. Otherwise, the journal is cleared
+
+        Yields
+        ------
+        (str, dict, str)
+            The outcome of every entry, see checker.validate_entry
+        """
+        completed, size = self.read(hashes) if resume else ([], 0)
+        if resume:
+            print(f"Resuming after {len(completed)} entries that were completed in an earlier run..")
+        yield from completed
+
+        with open(self.path, "ab" if resume else "wb") as file, closing(validate(len(completed))) as outcomes:
+            # Remove any line that was only partially written when the earlier run stopped
+            file.truncate(size)
+            for row, (status, entry, reason) in zip(hashes[len(completed):], outcomes):
+                file.write(json.dumps({"row": row, "status": status, "entry": entry, "reason": reason},
+                                      default=str).encode("utf8") + b"\n")
+                file.flush()
+                yield status, entry, reason
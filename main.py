@@ -1,17 +1,44 @@
 """
 Main file, entrypoint for the application.
 """
+from __future__ import annotations
 
+import argparse
 import sys
 import os
-import unicodedata
-import pandas as pd
-from util import query_yes_no
-from checker import correct_entries
-from pdf import generate_pdf
+from concurrent import futures
+from functools import partial
+from multiprocessing import Queue, freeze_support
+from util import input_files, lazy_import, query_yes_no
+from checker import validate_entries
+from correction import correct_entries, UNVERIFIED_POLICIES
+from journal import JOURNAL_FILE
+from async_checker import validate_entries_async
+from pdf import generate_pdf, generate_pdf_native, generate_pdf_sharded
+from ratelimit import GOOGLE_QPS, QuotaExceededException, google_limiter
+from report import REPORT_FILE, run_report
+from transport import RecordingTransport, ReplayTransport, network
+
+# Pandas is only imported when the input is read, so the program starts quickly
+pd = lazy_import("pandas")
 
 AUTHORS = ['Lars Jeurissen']
 VERSION = '1.0.5'
+# The columns of the input CSV files
+COLUMN_NAMES = ['first_name', 'last_name', 'address', 'address_2', 'postal_code', 'city', 'country']
+# The number of rows of an input CSV file that are parsed at once
+CHUNK_SIZE = 50000
+# The number of processes that parse input CSV files at the same time
+PARSING_PROCESSES = 4
+# The total size in bytes of the input CSV files below which they are parsed in this process, because
+# starting the processes would take longer than parsing the files
+PARALLEL_PARSING_SIZE = 16 * 1024 * 1024
+# The number of parsed chunks of a file that a process can send before the chunks are read
+QUEUED_CHUNKS = 4
+# The number of entries that are validated at the same time
+VALIDATION_WORKERS = 8
+# Whether to validate all entries at once using asynchronous requests, instead of worker threads
+ASYNC_VALIDATION = False
 PROGRAM_ART = ('  _______ _           _     _       _     _      \n'
                ' |__   __| |         | |   | |     (_)   | |     \n'
                '    | |  | |__   __ _| |__ | | ___  _  __| |     \n'
@@ -33,55 +60,323 @@ PROGRAM_ART = ('  _______ _           _     _       _     _      \n'
                '-------------------------------------------------------------------------------')
 
 
-def read_input(input_directory: str) -> pd.DataFrame:
+class ErroneousLineReport:
+    """
+    Writes the erroneous lines of the input files to a report file, instead of keeping them in
+    memory. The file is only created when the first erroneous line is added.
     """
-    Reads input CSV files from the given input directory and converts them to a DataFrame.
-    Invalid lines will be collected. If any invalid lines are encountered, the user will be
-    prompted on whether they want to continue.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def add(self, file_name: str, fields: list):
+        """
+        Adds an erroneous line to the report.
+
+        Parameters
+        ----------
+        file_name: str
+            The name of the file that contains the line
+        fields: list
+            The fields of the line
+        """
+        self._write(f"{file_name}: {','.join(fields)}\n")
+
+    def extend(self, path: str):
+        """
+        Moves the lines of another report file to this report, and removes the other file.
+
+        Parameters
+        ----------
+        path: str
+            The path of the other report file
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf8') as file:
+            for line in file:
+                self._write(line)
+        os.remove(path)
+
+    def _write(self, line: str):
+        if self._file is None:
+            self._file = open(self.path, 'w', encoding='utf8')  # pylint: disable=consider-using-with
+        self._file.write(line)
+        self.count += 1
+
+    def close(self):
+        """
+        Closes the report file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_csv_chunks(path: str, report: ErroneousLineReport):
+    """
+    Reads a CSV file in chunks. The fast C parser is used, unless the file contains erroneous lines.
+    In that case, the remainder of the file is parsed with the python parser, which can report them.
+
+    Parameters
+    ----------
+    path: str
+        The path of the CSV file
+    report: ErroneousLineReport
+        The report that erroneous lines are written to
+
+    Yields
+    ------
+    pd.DataFrame:
+        The entries in the file, in chunks of at most CHUNK_SIZE rows
+    """
+    options = {'header': 0, 'names': COLUMN_NAMES, 'dtype': str, 'keep_default_na': False,
+               'chunksize': CHUNK_SIZE}
+    parsed_rows = 0
+    try:
+        with pd.read_csv(path, engine='c', on_bad_lines='error', **options) as reader:
+            for chunk in reader:
+                parsed_rows += len(chunk)
+                yield chunk
+        return
+    except pd.errors.ParserError:
+        pass
+
+    # All rows before the first erroneous line were already parsed, so they are skipped
+    file_name = os.path.basename(path)
+    with pd.read_csv(path, engine='python', on_bad_lines=lambda fields: report.add(file_name, fields),
+                     **options) as reader:
+        for chunk in reader:
+            if parsed_rows < len(chunk):
+                yield chunk.iloc[parsed_rows:]
+            parsed_rows = max(parsed_rows - len(chunk), 0)
+
+
+def deduplicate(chunk: pd.DataFrame, seen_rows: set) -> pd.DataFrame:
+    """
+    Removes the rows from a chunk of entries that occur earlier in the chunk or that were seen
+    before, and remembers the remaining rows.
+
+    Parameters
+    ----------
+    chunk: pd.DataFrame
+        The chunk of entries
+    seen_rows: set
+        The hashes of the rows that were seen before, which is updated with the new rows
+
+    Returns
+    -------
+    pd.DataFrame:
+        The rows of the chunk that were not seen before
+    """
+    hashes = pd.util.hash_pandas_object(chunk, index=False)
+    unique = ~hashes.duplicated() & ~hashes.isin(seen_rows)
+    seen_rows.update(hashes[unique].tolist())
+    return chunk[unique]
+
+
+# The queues that the parsing processes send the chunks of every file through, see parse_csv_files
+_chunk_queues = []
+
+
+def _set_chunk_queues(queues: list):
+    # Queues can only be passed to a process when it is started, so they are stored for its tasks
+    _chunk_queues[:] = queues
+
+
+def parse_csv_file(index: int, path: str, report_file: str):
+    """
+    Parses a single CSV file, so that multiple files can be parsed in separate processes. The
+    chunks of the file are sent through the queue of the file as soon as they are parsed, followed
+    by None when the file is done.
+
+    Parameters
+    ----------
+    index: int
+        The index of the file, which is also the index of its queue
+    path: str
+        The path of the CSV file
+    report_file: str
+        The file that erroneous lines are written to
+    """
+    report = ErroneousLineReport(report_file)
+    seen_rows = set()
+    try:
+        for chunk in read_csv_chunks(path, report):
+            _chunk_queues[index].put(deduplicate(chunk, seen_rows))
+    finally:
+        report.close()
+        _chunk_queues[index].put(None)
+
+
+def read_chunks(queue: Queue):
+    """
+    Reads the chunks that a parsing process sends through a queue, until it sends None.
+
+    Parameters
+    ----------
+    queue: Queue
+        The queue of the file that is parsed
+
+    Yields
+    ------
+    pd.DataFrame:
+        The entries in the file, in chunks
+    """
+    chunk = queue.get()
+    while chunk is not None:
+        yield chunk
+        chunk = queue.get()
+
+
+def parse_csv_files(paths: list, report: ErroneousLineReport, processes: int = 1):
+    """
+    Parses CSV files, either one after another or in a pool of processes. Small inputs are always
+    parsed in this process. The chunks are yielded in the order of the files either way, and
+    erroneous lines are added to the report in that order.
+
+    Parameters
+    ----------
+    paths: list
+        The paths of the CSV files
+    report: ErroneousLineReport
+        The report that erroneous lines are written to
+    processes: int
+        The number of files that are parsed at the same time
+
+    Yields
+    ------
+    pd.DataFrame:
+        The entries in the files, in chunks
+    """
+    # More processes than files or processors would only wait
+    processes = min(processes, len(paths), os.cpu_count() or 1)
+    if processes <= 1 or sum(map(os.path.getsize, paths)) < PARALLEL_PARSING_SIZE:
+        for path in paths:
+            yield from read_csv_chunks(path, report)
+        return
+
+    # Every process writes the erroneous lines of its file to a separate report, which are merged.
+    # The queues are bounded, so processes wait while the chunks of earlier files are still read
+    reports = [f"{report.path}.{i}.part" for i in range(len(paths))]
+    queues = [Queue(QUEUED_CHUNKS) for _ in paths]
+    with futures.ProcessPoolExecutor(max_workers=processes, initializer=_set_chunk_queues,
+                                     initargs=(queues,)) as executor:
+        tasks = [executor.submit(parse_csv_file, i, path, file_report)
+                 for i, (path, file_report) in enumerate(zip(paths, reports))]
+        finished = 0
+        try:
+            for task, queue, file_report in zip(tasks, queues, reports):
+                yield from read_chunks(queue)
+                finished += 1
+                # Raises the exception of the process, if it failed to parse the file
+                task.result()
+                report.extend(file_report)
+        finally:
+            # If parsing stopped early, the files that are being parsed are read to the end, so that
+            # their processes do not wait for the queue forever, and the reports that were not merged
+            # are removed
+            for task, queue in zip(tasks[finished:], queues[finished:]):
+                if not task.cancel():
+                    for _ in read_chunks(queue):
+                        pass
+            for file_report in reports:
+                if os.path.exists(file_report):
+                    os.remove(file_report)
+
+
+def find_input_files(input_directory: str, interactive: bool = True) -> list:
+    """
+    Finds the input CSV files in the given input directory. The user is asked to put them there
+    first, and again as long as there are none.
 
     Parameters
     ----------
     input_directory: str
         The input directory where the CSV files are stored
+    interactive: bool
+        Whether the user is asked for input. Otherwise, the program exits if there are no CSV files
 
     Returns
     -------
-    pd.DataFrame:
-        A DataFrame containing all correct CSV file entries
+    list:
+        The paths of the CSV files, sorted by name
     """
-    # Read the CSV files
-    input("Put all address files (.csv) that you want to process in the 'input' folder. "
-          "Press enter when done.")
-    csvs = list(filter(lambda file: file.endswith('.csv'), os.listdir(input_directory)))
+    if interactive:
+        input(f"Put all address files (.csv) that you want to process in the '{input_directory}' folder. "
+              f"Press enter when done.")
+    csvs = sorted(filter(lambda file: file.endswith('.csv'), os.listdir(input_directory)))
     while len(csvs) <= 0:
+        if not interactive:
+            sys.exit(f"No .csv files found in '{input_directory}'")
         input("No .csv files detected. Press enter when you have added them.")
-        csvs = list(filter(lambda file: file.endswith('.csv'), os.listdir(input_directory)))
-
-    # Parse the CSV files into a pandas dataframe
-    print(f"Parsing {len(csvs)} input file(s)..")
-    column_names = ['first_name', 'last_name', 'address',
-                    'address_2', 'postal_code', 'city', 'country']
-
-    erroneous_lines = []
-    input_data = pd.concat([pd.read_csv(os.path.join(input_directory, csv), header=0,
-                                        names=column_names, engine='python',
-                                        on_bad_lines=lambda l: erroneous_lines.append(','.join(l)),
-                                        keep_default_na=False) for csv in csvs]).drop_duplicates()
+        csvs = sorted(filter(lambda file: file.endswith('.csv'), os.listdir(input_directory)))
+    return [os.path.join(input_directory, csv) for csv in csvs]
+
+
+def read_input(paths: list, report_file: str, processes: int = 1) -> (pd.DataFrame, int):
+    """
+    Reads input CSV files and converts them to a DataFrame. Invalid lines will be written to a
+    report file.
+
+    Parameters
+    ----------
+    paths: list
+        The paths of the CSV files, see find_input_files
+    report_file: str
+        The file that invalid lines are written to
+    processes: int
+        The number of input files that are parsed at the same time
+
+    Returns
+    -------
+    (pd.DataFrame, int):
+        A tuple containing a DataFrame with all correct CSV file entries, and the number of invalid
+        lines
+    """
+    # Parse the CSV files into a pandas dataframe, dropping duplicates as the rows come in
+    print(f"Parsing {len(paths)} input file(s)..")
+    report = ErroneousLineReport(report_file)
+    seen_rows = set()
+    chunks = []
+    try:
+        for chunk in parse_csv_files(paths, report, processes):
+            chunks.append(deduplicate(chunk, seen_rows))
+    finally:
+        report.close()
     # Re-index the dataframe so that we don't have double indices
-    input_data.reset_index(drop=True, inplace=True)
-    # If there are erroneous lines, prompt the user to ask if they want to continue
-    if len(erroneous_lines) > 0:
+    input_data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=COLUMN_NAMES)
+    if report.count > 0:
         print("----------")
-        print(f"Encountered {len(erroneous_lines)} erroneous line(s) in the input csv file(s):")
-        print(*erroneous_lines, sep="\n")
+        print(f"Encountered {report.count} erroneous line(s) in the input csv file(s), "
+              f"these are listed in {report_file}")
         print("----------")
 
-        if query_yes_no("We will continue with the remaining entries if you don't exit. "
-                        "Do you want to exit?", "yes"):
-            sys.exit(0)
-
     print(f"Read {len(input_data)} data entries")
-    return input_data
+    return input_data, report.count
+
+
+def to_ascii(values: pd.Series) -> pd.Series:
+    """
+    Converts a column of strings to ascii. German s'es are converted to two s'es, accents are
+    removed and other non-ascii characters are dropped. Every distinct value is only converted once.
+
+    Parameters
+    ----------
+    values: pd.Series
+        The column of strings
+
+    Returns
+    -------
+    pd.Series:
+        The converted column
+    """
+    unique_values = pd.Series(values.unique(), dtype=object)
+    converted = unique_values.str.replace('\xdf', 'ss', regex=False).str.normalize('NFKD') \
+        .str.encode('ascii', 'ignore').str.decode('ascii')
+    return values.map(dict(zip(unique_values, converted)))
 
 
 def format_entries(input_entries: pd.DataFrame):
@@ -94,16 +389,9 @@ def format_entries(input_entries: pd.DataFrame):
     input_entries: pd.DataFrame
         The input entries to be formatted, stored in a dataframe
     """
-    for _, entry in input_entries.iterrows():
-        # Convert german s to double s
-        entry['address'] = entry['address'].replace('\xdf', 'ss')
-        entry['address_2'] = entry['address_2'].replace('\xdf', 'ss')
-        entry['city'] = entry['city'].replace('\xdf', 'ss')
-        # Format to ascii
-        entry['address'] = unicodedata.normalize('NFKD', entry['address']).encode('ascii', 'ignore').decode("ascii")
-        entry['address_2'] = unicodedata.normalize('NFKD', entry['address_2']).encode('ascii', 'ignore').decode("ascii")
-        entry['city'] = unicodedata.normalize('NFKD', entry['city']).encode('ascii', 'ignore').decode("ascii")
-        entry['postal_code'] = entry['postal_code'].upper()
+    for column in ('address', 'address_2', 'city'):
+        input_entries[column] = to_ascii(input_entries[column])
+    input_entries['postal_code'] = input_entries['postal_code'].str.upper()
 
 
 def post_process_entries(input_entries: pd.DataFrame):
@@ -116,52 +404,165 @@ def post_process_entries(input_entries: pd.DataFrame):
     input_entries: pd.DataFrame
         The input entries to be post-processed, stored in a dataframe
     """
-    for _, entry in input_entries.iterrows():
-        # Format Dutch postal codes
-        if entry["country"] == "Netherlands" and len(entry["postal_code"]) == 6:
-            entry["postal_code"] = f"{entry['postal_code'][:4]} {entry['postal_code'][4:]}"
-        # Uppercase cities and countries
-        entry["city"] = entry["city"].upper()
-        entry["country"] = entry["country"].upper()
-        # Format german s
-        entry['address'] = entry['address'].replace('\xdf', 'ss')
-        entry['address_2'] = entry['address_2'].replace('\xdf', 'ss')
-        entry['city'] = entry['city'].replace('\xdf', 'ss')
+    # Format Dutch postal codes
+    postal_codes = input_entries['postal_code']
+    dutch = (input_entries['country'] == 'Netherlands') & (postal_codes.str.len() == 6)
+    input_entries.loc[dutch, 'postal_code'] = postal_codes[dutch].str[:4] + ' ' + postal_codes[dutch].str[4:]
+    # Uppercase cities and countries
+    input_entries['city'] = input_entries['city'].str.upper()
+    input_entries['country'] = input_entries['country'].str.upper()
+    # Format german s
+    for column in ('address', 'address_2', 'city'):
+        input_entries[column] = input_entries[column].str.replace('\xdf', 'ss', regex=False)
+
+
+def parse_arguments(arguments: list = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments of the application.
+
+    Parameters
+    ----------
+    arguments: list
+        The command line arguments, or None to use sys.argv
+
+    Returns
+    -------
+    argparse.Namespace
+        The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Turns CSV files containing member names and addresses into a PDF "
+                                                 "that can be printed onto an A4 sticker sheet.")
+    parser.add_argument("--input", default="input",
+                        help="the directory containing the CSV files, and the credentials, caches and other files that "
+                             "belong with them (default: input)")
+    parser.add_argument("--output", default="output", help="the directory that the results are written to "
+                                                           "(default: output)")
+    parser.add_argument("--batch", action="store_true",
+                        help="never ask for input. Questions are answered by the other options instead")
+    parser.add_argument("--check", dest="check", action="store_true", default=None,
+                        help="check and correct the entries using various APIs (default in batch mode)")
+    parser.add_argument("--no-check", dest="check", action="store_false",
+                        help="do not check the entries")
+    parser.add_argument("--unverified", choices=UNVERIFIED_POLICIES, default=None,
+                        help="what to do with addresses that could not be validated "
+                             "(default: ask, or drop in batch mode)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run using the journal in the output directory")
+    parser.add_argument("--workers", type=int, default=VALIDATION_WORKERS,
+                        help=f"the number of entries that are validated at the same time "
+                             f"(default: {VALIDATION_WORKERS})")
+    parser.add_argument("--parse-workers", type=int, default=PARSING_PROCESSES,
+                        help=f"the number of processes that parse the input files, if they are larger than "
+                             f"{PARALLEL_PARSING_SIZE // (1024 * 1024)} MB together (default: {PARSING_PROCESSES})")
+    parser.add_argument("--engine", choices=("threads", "async"), default="async" if ASYNC_VALIDATION else "threads",
+                        help="validate using worker threads or asynchronous requests")
+    parser.add_argument("--pdf-backend", choices=("reportlab", "native"), default="reportlab",
+                        help="render the pdf with reportlab or with the faster built-in pdf writer")
+    parser.add_argument("--pdf-workers", type=int, default=1,
+                        help="the number of processes that render the pdf. With more than one process, the pages are "
+                             "always rendered by the built-in pdf writer (default: 1)")
+    parser.add_argument("--google-qps", type=float, default=GOOGLE_QPS,
+                        help=f"the maximum number of requests per second to the Google Geocoding API, or 0 for no "
+                             f"limit (default: {GOOGLE_QPS})")
+    parser.add_argument("--google-budget", type=int, default=None,
+                        help="the maximum number of requests to the Google Geocoding API in this run. The run stops "
+                             "when it is spent, and can be resumed later (default: no limit)")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE",
+                          help="record all responses of the APIs in a cassette file")
+    cassette.add_argument("--replay", metavar="CASSETTE",
+                          help="answer all API requests with the responses in a cassette file, without a network")
+    parser.add_argument("--latency", type=float, default=None,
+                        help="the number of seconds that every replayed response takes "
+                             "(default: as long as it took when it was recorded)")
+    parsed = parser.parse_args(arguments)
+    if parsed.latency is not None and parsed.replay is None:
+        parser.error("--latency can only be used with --replay")
+    if parsed.batch and parsed.unverified == "ask":
+        parser.error("--unverified ask can not be used in batch mode")
+    if parsed.unverified is None:
+        parsed.unverified = "drop" if parsed.batch else "ask"
+    return parsed
 
 
 if __name__ == "__main__":
+    # Needed for the process pool in the frozen executable
+    freeze_support()
+    ARGUMENTS = parse_arguments()
+
     # Print introduction
     print(PROGRAM_ART.format(VERSION, ", ".join(AUTHORS)))
 
     # Validate input and output directories
-    INPUT_DIR = 'input'
-    OUTPUT_DIR = 'output'
+    INPUT_DIR = ARGUMENTS.input
+    OUTPUT_DIR = ARGUMENTS.output
     if not os.path.exists(INPUT_DIR):
-        os.mkdir(INPUT_DIR)
-    while os.path.exists(OUTPUT_DIR) and os.listdir(OUTPUT_DIR):
-        input("The 'output' directory is not empty, please delete its contents. "
-              "Press enter when done.")
+        os.makedirs(INPUT_DIR)
+    input_files.use(INPUT_DIR)
+    # A run that was interrupted during the correction of the entries can be continued
+    RESUME = ARGUMENTS.resume or not ARGUMENTS.batch and os.path.exists(os.path.join(OUTPUT_DIR, JOURNAL_FILE)) \
+        and query_yes_no(f"The '{OUTPUT_DIR}' directory contains the journal of an earlier run. "
+                         f"Do you want to resume this run?", "yes")
+    while not RESUME and os.path.exists(OUTPUT_DIR) and os.listdir(OUTPUT_DIR):
+        if ARGUMENTS.batch:
+            sys.exit(f"The '{OUTPUT_DIR}' directory is not empty")
+        input(f"The '{OUTPUT_DIR}' directory is not empty, please delete its contents. "
+              f"Press enter when done.")
     if not os.path.exists(OUTPUT_DIR):
-        os.mkdir(OUTPUT_DIR)
+        os.makedirs(OUTPUT_DIR)
 
-    # Read the input from the input directory
-    entries = read_input(INPUT_DIR)
+    # Read the input from the input directory. The time that the user takes to answer is not part of the stage
+    INPUT_FILES = find_input_files(INPUT_DIR, not ARGUMENTS.batch)
+    with run_report.stage("read_input"):
+        entries, ERRONEOUS_LINES = read_input(INPUT_FILES, os.path.join(OUTPUT_DIR, "erroneous_lines.log"),
+                                              ARGUMENTS.parse_workers)
+    # If there are erroneous lines, ask the user whether they want to continue
+    if ERRONEOUS_LINES > 0 and not ARGUMENTS.batch \
+            and query_yes_no("We will continue with the remaining entries if you don't exit. Do you want to exit?",
+                             "yes"):
+        sys.exit(0)
 
     # Do some basic entry formatting
-    format_entries(entries)
+    with run_report.stage("format_entries"):
+        format_entries(entries)
 
     # Optional: Check entries in the Google Maps API
-    if query_yes_no("Entries can be checked and corrected using various APIs. "
-                    "Do you want to do this?", "yes"):
-        no_invalid, no_changed = correct_entries(entries, OUTPUT_DIR)
+    CHECK = ARGUMENTS.check if ARGUMENTS.check is not None else \
+        ARGUMENTS.batch or query_yes_no("Entries can be checked and corrected using various APIs. "
+                                        "Do you want to do this?", "yes")
+    if CHECK:
+        if ARGUMENTS.record:
+            network.use(RecordingTransport(ARGUMENTS.record))
+        elif ARGUMENTS.replay:
+            network.use(ReplayTransport(ARGUMENTS.replay, ARGUMENTS.latency))
+        google_limiter.configure(ARGUMENTS.google_qps or None, ARGUMENTS.google_budget)
+        VALIDATOR = validate_entries_async if ARGUMENTS.engine == "async" else \
+            partial(validate_entries, workers=ARGUMENTS.workers)
+        try:
+            with run_report.stage("correct_entries"):
+                no_invalid, no_changed = correct_entries(entries, OUTPUT_DIR, VALIDATOR, RESUME,
+                                                         ARGUMENTS.unverified)
+        except QuotaExceededException as exception:
+            sys.exit(f"{exception.message}. The entries that were validated are kept in the journal, run the "
+                     f"application again with --resume to continue")
         print(f"Number of invalid addresses: {no_invalid}")
         print(f"Number of changed addresses: {no_changed}")
 
     # Apply postprocessing to the entries
-    post_process_entries(entries)
+    with run_report.stage("post_process_entries"):
+        post_process_entries(entries)
 
     # Generate the output PDF
-    generate_pdf(entries, os.path.join(OUTPUT_DIR, "sticker_sheet.pdf"))
+    with run_report.stage("generate_pdf"):
+        if ARGUMENTS.pdf_workers > 1:
+            generate_pdf_sharded(entries, os.path.join(OUTPUT_DIR, "sticker_sheet.pdf"), ARGUMENTS.pdf_workers)
+        elif ARGUMENTS.pdf_backend == "native":
+            generate_pdf_native(entries, os.path.join(OUTPUT_DIR, "sticker_sheet.pdf"))
+        else:
+            generate_pdf(entries, os.path.join(OUTPUT_DIR, "sticker_sheet.pdf"))
+
+    # Write the time and memory that every stage used, and the requests to every API
+    run_report.write(os.path.join(OUTPUT_DIR, REPORT_FILE), VERSION)
 
     print("Generation complete! Thank you for using the amazing Thabloid Sticker Generator, "
           "see you in a few months!")
@@ -1,13 +1,15 @@
 """
 File containing functionality to generate PDFs, given a list of entries
 """
-import os
-import sys
+from concurrent import futures
+from functools import partial
 
-import pandas as pd
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
+from fonts import get_font
+from pdfwriter import TextDocument, deflate, escape, numbers
+from util import lazy_import
+
+pd = lazy_import("pandas")
+canvas = lazy_import("reportlab.pdfgen.canvas")
 
 # ===============
 #  PDF CONSTANTS
@@ -29,65 +31,261 @@ LABEL_HEIGHT = 38.1
 MARGIN_TEXT_TOP = 9.5
 MARGIN_TEXT_LEFT = 6.5
 MARGIN_TEXT_INNER = 4.75
+# Font and document settings
+FONT_FILE = "resources/cmunss.ttf"
+FONT_SIZE = 11
+TITLE = "Thabloid Stickers"
+# The number of pages that a process renders at once when rendering in parallel
+PAGES_PER_TASK = 16
+# The point (in pt) where the text starts in every slot of a page, row by row. Note that y is
+# inverted, because it starts at the bottom of the page
+LABEL_SLOTS = tuple((PPM * (MARGIN_LEFT + column * LABEL_WIDTH + MARGIN_TEXT_LEFT),
+                     PPM * (PAGE_HEIGHT - (MARGIN_TOP + row * LABEL_HEIGHT + MARGIN_TEXT_TOP)))
+                    for row in range(ROWS) for column in range(COLUMNS))
+# The distance (in pt) between the lines of a label
+LINE_SPACING = PPM * MARGIN_TEXT_INNER
+# The operators that start the text object of a label in every slot of a page
+SLOT_OPERATORS = tuple(b"BT %s Td" % numbers(*slot) for slot in LABEL_SLOTS)
+
+
+def entry_records(input_data):
+    """
+    Iterates over the entries of a dataframe as dictionaries, without copying the dataframe. Any
+    other iterable of entries is returned as is.
+
+    Parameters
+    ----------
+    input_data
+        A dataframe or an iterable of entries, represented as dictionaries
+
+    Returns
+    -------
+    iterable
+        An iterable of entries, represented as dictionaries
+    """
+    if isinstance(input_data, pd.DataFrame):
+        columns = list(input_data.columns)
+        return (dict(zip(columns, values)) for values in input_data.itertuples(index=False, name=None))
+    return input_data
 
 
-def generate_pdf(input_data: pd.DataFrame, out_file: str):
+def label_lines(entry: dict) -> list:
     """
-    Generates a pdf in the sticker print format, given an input data dataframe
+    Determines the lines of text on the label of an entry.
 
     Parameters
     ----------
-    input_data: pd.DataFrame
-        List of entries containing names and addresses, to be stored in a pdf
+    entry: dict
+        The entry, represented as a dictionary
+
+    Returns
+    -------
+    list
+        The name, address, second address line if it is set, postcode and town, and the country if
+        it is not the Netherlands
+    """
+    lines = [entry["first_name"] + " " + entry["last_name"], entry["address"]]
+    if len(entry["address_2"]) != 0:
+        lines.append(entry["address_2"])
+    lines.append(entry["postal_code"] + "  " + entry["city"])
+    if len(entry["country"]) != 0 and entry["country"].lower() != "netherlands":
+        lines.append(entry["country"].upper())
+    return lines
+
+
+def generate_pdf(input_data, out_file: str) -> int:
+    """
+    Generates a pdf in the sticker print format, given the entries. The entries are drawn one by
+    one as they are iterated over, so they can still be produced while the pdf is generated.
+
+    Parameters
+    ----------
+    input_data
+        A dataframe or an iterable of entries containing names and addresses, to be stored in a pdf
     out_file: str
         The output pdf file
 
     Returns
     -------
-    pd.DataFrame:
-        A DataFrame containing all correct CSV file entries
+    int:
+        The number of entries in the pdf
     """
-    # Loading PDF font
-    if getattr(sys, 'frozen', False):
-        font = os.path.join(sys._MEIPASS, 'resources/cmunss.ttf')
-    else:
-        font = "resources/cmunss.ttf"
     # Initialise PDF settings
-    print(f"Exporting {len(input_data)} addresses to {out_file}...")
+    if hasattr(input_data, "__len__"):
+        print(f"Exporting {len(input_data)} addresses to {out_file}...")
+    else:
+        print(f"Exporting addresses to {out_file}...")
     pdf = canvas.Canvas(out_file, pagesize=(PPM * PAGE_WIDTH, PPM * PAGE_HEIGHT))
-    pdf.setTitle("Thabloid Stickers")
-    pdfmetrics.registerFont(TTFont("cmunss", font))
-    pdf.setFont("cmunss", 11)
-
-    # Loop through all input entries
-    for i, entry in input_data.iterrows():
-        row = i % ITEMS_PER_PAGE // 2
-        column = (i % ITEMS_PER_PAGE) % COLUMNS
-
-        # Calculate text positions (note that we invert y
-        # because it starts at the bottom for some reason)
-        text_x = MARGIN_LEFT + column * LABEL_WIDTH + MARGIN_TEXT_LEFT
-        text_y = PAGE_HEIGHT - (MARGIN_TOP + row * LABEL_HEIGHT + MARGIN_TEXT_TOP)
-
-        # Draw the name and address
-        pdf.drawString(PPM * text_x, PPM * text_y, entry["first_name"] + " " + entry["last_name"])
-        pdf.drawString(PPM * text_x, PPM * (text_y - MARGIN_TEXT_INNER), entry["address"])
-        # Draw second address line, postcode and town. Depends on if a second address line is set
-        postal_code_and_city = entry["postal_code"] + "  " + entry["city"]
-        if len(entry["address_2"]) != 0:
-            pdf.drawString(PPM * text_x, PPM * (text_y - 2 * MARGIN_TEXT_INNER), entry["address_2"])
-            pdf.drawString(PPM * text_x, PPM * (text_y - 3 * MARGIN_TEXT_INNER), postal_code_and_city)
-            if len(entry["country"]) != 0 and entry["country"].lower() != "netherlands":
-                pdf.drawString(PPM * text_x, PPM * (text_y - 4 * MARGIN_TEXT_INNER), entry["country"].upper())
-        else:
-            pdf.drawString(PPM * text_x, PPM * (text_y - 2 * MARGIN_TEXT_INNER), postal_code_and_city)
-            if len(entry["country"]) != 0 and entry["country"].lower() != "netherlands":
-                pdf.drawString(PPM * text_x, PPM * (text_y - 3 * MARGIN_TEXT_INNER), entry["country"].upper())
+    pdf.setTitle(TITLE)
+    # The font is only loaded and registered the first time a pdf is generated
+    get_font("cmunss", FONT_FILE)
+    pdf.setFont("cmunss", FONT_SIZE, LINE_SPACING)
+
+    # Loop through all input entries, the position of an entry determines where it is placed
+    count = 0
+    for count, entry in enumerate(entry_records(input_data), 1):
+        # Draw the name, address, postcode and town, and the country if it is not the Netherlands,
+        # as a single text object that moves down one line after every line
+        text = pdf.beginText(*LABEL_SLOTS[(count - 1) % ITEMS_PER_PAGE])
+        for line in label_lines(entry):
+            text.textLine(line)
+        pdf.drawText(text)
 
         # If we reached a new page, print the current page and re-set the font
-        if (i + 1) % ITEMS_PER_PAGE == 0:
+        if count % ITEMS_PER_PAGE == 0:
             pdf.showPage()
-            pdf.setFont("cmunss", 11)
+            pdf.setFont("cmunss", FONT_SIZE, LINE_SPACING)
 
-    # Save the pdf
+    # Save the pdf. A pdf without entries still gets an (empty) page, so that it is a valid document
+    if count == 0:
+        pdf.showPage()
     pdf.save()
+    return count
+
+
+def page_content(encoding, labels: list) -> bytes:
+    """
+    Creates the content stream of a page of labels. Every label is a single text object that moves
+    down one line after every line, and a subset of the font is only selected when it changes.
+
+    Parameters
+    ----------
+    encoding: pdfwriter.FontEncoding
+        The encoding of the font in the document
+    labels: list
+        The lines of text of every label on the page, see label_lines
+
+    Returns
+    -------
+    bytes:
+        The (uncompressed) content stream of the page
+    """
+    # The font and the line spacing are part of the graphics state, so they carry over between labels
+    operators = [b"%s TL" % numbers(LINE_SPACING)]
+    current = None
+    for slot, lines in zip(SLOT_OPERATORS, labels):
+        operators.append(slot)
+        for line, text in enumerate(lines):
+            if line > 0:
+                operators.append(b"T*")
+            for subset, codes in encoding.runs(text):
+                if subset != current:
+                    operators.append(encoding.select(subset, FONT_SIZE))
+                    current = subset
+                operators.append(b"(%s) Tj" % escape(bytes(codes)))
+        operators.append(b"ET\n")
+    return b" ".join(operators)
+
+
+def generate_pdf_native(input_data, out_file: str) -> int:
+    """
+    Generates a pdf in the sticker print format like generate_pdf, but writes the pdf objects with
+    the built-in pdf writer instead of reportlab. Every page is written to the file as soon as it
+    is full, and characters are added to the embedded font as they are used.
+
+    Parameters
+    ----------
+    input_data
+        A dataframe or an iterable of entries containing names and addresses, to be stored in a pdf
+    out_file: str
+        The output pdf file
+
+    Returns
+    -------
+    int:
+        The number of entries in the pdf
+    """
+    print(f"Exporting addresses to {out_file}...")
+    with open(out_file, "wb") as file:
+        document = TextDocument(file, get_font("cmunss", FONT_FILE).face, (PPM * PAGE_WIDTH, PPM * PAGE_HEIGHT),
+                                TITLE)
+        labels = []
+        count = 0
+        for count, entry in enumerate(entry_records(input_data), 1):
+            labels.append(label_lines(entry))
+            if count % ITEMS_PER_PAGE == 0:
+                document.add_page(page_content(document.encoding, labels))
+                labels = []
+        if labels:
+            document.add_page(page_content(document.encoding, labels))
+        document.close()
+    return count
+
+
+def render_page(encoding, labels: list) -> bytes:
+    """
+    Creates the compressed content stream of a page of labels.
+
+    Parameters
+    ----------
+    encoding: pdfwriter.FontEncoding
+        The encoding of the font in the document
+    labels: list
+        The lines of text of every label on the page, see label_lines
+
+    Returns
+    -------
+    bytes:
+        The compressed content stream of the page
+    """
+    return deflate(page_content(encoding, labels))
+
+
+def render_pages(encoding, pages: list, workers: int = 1):
+    """
+    Renders pages of labels in a pool of processes. The content streams are yielded in the order of
+    the pages, as soon as they are available.
+
+    Parameters
+    ----------
+    encoding: pdfwriter.FontEncoding
+        The encoding of the font in the document, which must already contain all characters
+    pages: list
+        The labels on every page, see page_content
+    workers: int
+        The number of processes that render pages at the same time
+
+    Yields
+    ------
+    bytes:
+        The compressed content stream of each page
+    """
+    if workers <= 1:
+        yield from map(partial(render_page, encoding), pages)
+        return
+    with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(partial(render_page, encoding), pages, chunksize=PAGES_PER_TASK)
+
+
+def generate_pdf_sharded(input_data, out_file: str, workers: int = 1) -> int:
+    """
+    Generates a pdf in the sticker print format like generate_pdf, but renders and compresses the
+    pages in a pool of processes. All processes use the same font encoding, which is agreed on
+    before rendering, so the pages are merged into one pdf with a single embedded font.
+
+    Parameters
+    ----------
+    input_data
+        A dataframe or an iterable of entries containing names and addresses, to be stored in a pdf
+    out_file: str
+        The output pdf file
+    workers: int
+        The number of processes that render pages at the same time
+
+    Returns
+    -------
+    int:
+        The number of entries in the pdf
+    """
+    labels = [label_lines(entry) for entry in entry_records(input_data)]
+    print(f"Exporting {len(labels)} addresses to {out_file} using {workers} process(es)...")
+    pages = [labels[start:start + ITEMS_PER_PAGE] for start in range(0, len(labels), ITEMS_PER_PAGE)]
+    characters = set("".join(line for lines in labels for line in lines))
+
+    with open(out_file, "wb") as file:
+        document = TextDocument(file, get_font("cmunss", FONT_FILE).face, (PPM * PAGE_WIDTH, PPM * PAGE_HEIGHT),
+                                TITLE, characters)
+        for content in render_pages(document.encoding, pages, workers):
+            document.add_page(content, compressed=True)
+        document.close()
+    return len(labels)
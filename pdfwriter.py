@@ -0,0 +1,326 @@
+"""
+File containing a minimal PDF writer for documents that only contain text in a single TrueType font.
+Pages are written to the output file as soon as they are added, and only the characters that are
+used are embedded, in subsets of at most 256 characters like reportlab does.
+"""
+
+import zlib
+
+from util import lazy_import
+
+ttfonts = lazy_import("reportlab.pdfbase.ttfonts")
+
+# The internal name of the font; every subset is a separate font named /F1+<subset>
+FONT_NAME = "F1"
+# The number of characters in a subset
+SUBSET_SIZE = 256
+# The range of characters that keep their own code in the first subset, so text stays readable
+ASCII = range(32, 127)
+
+
+def deflate(data: bytes) -> bytes:
+    """
+    Compresses the content of a stream, so that it can be added with a FlateDecode filter.
+
+    Parameters
+    ----------
+    data: bytes
+        The content of the stream
+
+    Returns
+    -------
+    bytes:
+        The compressed content
+    """
+    return zlib.compress(data)
+
+
+def numbers(*values: float) -> bytes:
+    """
+    Formats numbers for use in a PDF file, with at most four decimals.
+
+    Parameters
+    ----------
+    values: float
+        The numbers to format
+
+    Returns
+    -------
+    bytes:
+        The formatted numbers, separated by spaces
+    """
+    return b" ".join((b"%.4f" % value).rstrip(b"0").rstrip(b".") if value % 1 else b"%d" % value
+                     for value in values)
+
+
+def escape(data: bytes) -> bytes:
+    """
+    Escapes a string for use in a PDF literal string.
+
+    Parameters
+    ----------
+    data: bytes
+        The encoded string
+
+    Returns
+    -------
+    bytes:
+        The escaped string, without the surrounding parentheses
+    """
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").replace(b"\r", b"\\r")
+
+
+class FontEncoding:
+    """
+    Assigns single-byte codes in subsets of 256 characters to the characters of a font. Codes are
+    assigned in the order in which characters are first used, so processes that are given the same
+    characters up front produce the same codes.
+    """
+
+    def __init__(self, available: set, characters=()):
+        self.available = available
+        self.subsets = [[0] * ASCII.start + [character if character in available else 0 for character in ASCII]]
+        self.codes = {character: (0, character) for character in ASCII if character in available}
+        self._next = 1
+        for character in sorted(set(map(ord, characters))):
+            self.code(character)
+
+    def code(self, character: int) -> (int, int):
+        """
+        Retrieves the subset and code of a character, and assigns them if the character has not
+        been used before. Characters that are not in the font are shown as the missing glyph.
+
+        Parameters
+        ----------
+        character: int
+            The unicode code point of the character
+
+        Returns
+        -------
+        (int, int)
+            A tuple containing the subset and the code of the character in the subset
+        """
+        if character == 0xa0:
+            character = 32
+        if character in self.codes:
+            return self.codes[character]
+        if character not in self.available:
+            return 0, 0
+
+        # Code 0 is the missing glyph and code 32 is a space in every subset
+        subset, code = divmod(self._next, SUBSET_SIZE)
+        while code == 0 or code == 32 or subset == 0 and code in ASCII:
+            self._next += 1
+            subset, code = divmod(self._next, SUBSET_SIZE)
+        self._next += 1
+
+        if subset == len(self.subsets):
+            self.subsets.append([0] * 32 + [32])
+        self.subsets[subset].extend([0] * (code + 1 - len(self.subsets[subset])))
+        self.subsets[subset][code] = character
+        self.codes[character] = subset, code
+        return subset, code
+
+    def runs(self, text: str) -> list:
+        """
+        Encodes a string as runs of characters that are in the same subset.
+
+        Parameters
+        ----------
+        text: str
+            The string to encode
+
+        Returns
+        -------
+        list
+            A list of tuples containing the subset of a run and the codes of its characters
+        """
+        runs = []
+        current = None
+        for character in map(ord, text):
+            subset, code = self.code(character)
+            if subset != current:
+                runs.append((subset, bytearray()))
+                current = subset
+            runs[-1][1].append(code)
+        return runs
+
+    @staticmethod
+    def select(subset: int, size: float) -> bytes:
+        """
+        Creates the text operator that selects a subset of the font.
+
+        Parameters
+        ----------
+        subset: int
+            The number of the subset
+        size: float
+            The font size
+
+        Returns
+        -------
+        bytes:
+            The content stream operator that selects the subset
+        """
+        return b"/%s+%d %s Tf" % (FONT_NAME.encode("ascii"), subset, numbers(size))
+
+
+class PdfWriter:
+    """
+    Writes the objects of a PDF file one by one and keeps track of their positions, so that the
+    cross-reference table can be written when the file is closed.
+    """
+
+    def __init__(self, file):
+        self._file = file
+        self._offsets = {}
+        self._next = 1
+        self._position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._position += len(data)
+
+    def reserve(self) -> int:
+        """
+        Reserves an object number, so that an object can be referred to before it is written.
+
+        Returns
+        -------
+        int:
+            The object number
+        """
+        number = self._next
+        self._next += 1
+        return number
+
+    def add_object(self, body: bytes, number: int = None) -> int:
+        """
+        Writes an object to the file.
+
+        Parameters
+        ----------
+        body: bytes
+            The serialized object
+        number: int
+            The reserved number of the object, or None to use a new number
+
+        Returns
+        -------
+        int:
+            The object number
+        """
+        if number is None:
+            number = self.reserve()
+        self._offsets[number] = self._position
+        self._write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        return number
+
+    def add_stream(self, data: bytes, entries: bytes = b"", number: int = None) -> int:
+        """
+        Writes a stream object to the file.
+
+        Parameters
+        ----------
+        data: bytes
+            The (possibly compressed) content of the stream
+        entries: bytes
+            Additional entries of the stream dictionary, such as its filter
+        number: int
+            The reserved number of the object, or None to use a new number
+
+        Returns
+        -------
+        int:
+            The object number
+        """
+        return self.add_object(b"<< /Length %d %s>>\nstream\n%s\nendstream" % (len(data), entries, data), number)
+
+    def close(self, root: int, info: int):
+        """
+        Writes the cross-reference table and the trailer of the file.
+
+        Parameters
+        ----------
+        root: int
+            The object number of the document catalog
+        info: int
+            The object number of the document information dictionary
+        """
+        start = self._position
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % self._next)
+        self._write(b"".join(b"%010d 00000 n \n" % self._offsets[number] for number in range(1, self._next)))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (self._next, root, info, start))
+
+
+class TextDocument:
+    """
+    A PDF document consisting of pages with text in a single TrueType font, which is written to a
+    file while the pages are added. The font subsets are embedded when the document is closed.
+    """
+
+    def __init__(self, file, font, page_size: (float, float), title: str, characters=()):
+        self.writer = PdfWriter(file)
+        # The parsed font file (a reportlab TTFontFile), which is only read and can be shared between documents
+        self.font = font
+        self.encoding = FontEncoding(set(self.font.charToGlyph), characters)
+        self.page_size = page_size
+        self._pages = []
+        # The objects that pages refer to are written when the document is closed
+        self._objects = {"pages": self.writer.reserve(), "resources": self.writer.reserve(),
+                         "info": self.writer.add_object(b"<< /Title (%s) /Producer (Thabloid Sticker Generator) >>"
+                                                        % escape(title.encode("latin-1")))}
+
+    def add_page(self, content: bytes, compressed: bool = False):
+        """
+        Adds a page to the document and writes it to the file.
+
+        Parameters
+        ----------
+        content: bytes
+            The content stream of the page, which uses the encoding of the document
+        compressed: bool
+            Whether the content has already been compressed with deflate
+        """
+        contents = self.writer.add_stream(content if compressed else deflate(content), b"/Filter /FlateDecode ")
+        self._pages.append(self.writer.add_object(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %s] /Resources %d 0 R /Contents %d 0 R >>"
+            % (self._objects["pages"], numbers(*self.page_size), self._objects["resources"], contents)))
+
+    def _add_subset(self, subset_number: int, subset: list) -> int:
+        font = self.font
+        base_font = b"".join((ttfonts.SUBSETN(subset_number), b"+", font.name, font.subfontNameX))
+        to_unicode = self.writer.add_stream(deflate(ttfonts.makeToUnicodeCMap(base_font.decode("latin-1"),
+                                                                              subset).encode("latin-1")),
+                                            b"/Filter /FlateDecode ")
+        font_data = font.makeSubset(subset)
+        font_file = self.writer.add_stream(deflate(font_data), b"/Filter /FlateDecode /Length1 %d " % len(font_data))
+        descriptor = self.writer.add_object(
+            b"<< /Type /FontDescriptor /FontName /%s /Flags %d /FontBBox [%s] /ItalicAngle %s /Ascent %s "
+            b"/Descent %s /CapHeight %s /StemV %s /MissingWidth %s /FontFile2 %d 0 R >>"
+            % (base_font, font.flags & ~ttfonts.FF_NONSYMBOLIC | ttfonts.FF_SYMBOLIC, numbers(*font.bbox),
+               numbers(font.italicAngle), numbers(font.ascent), numbers(font.descent), numbers(font.capHeight),
+               numbers(font.stemV), numbers(font.defaultWidth), font_file))
+        widths = numbers(*(font.charWidths.get(character, font.defaultWidth) for character in subset))
+        return self.writer.add_object(
+            b"<< /Type /Font /Subtype /TrueType /BaseFont /%s /FirstChar 0 /LastChar %d /Widths [%s] "
+            b"/FontDescriptor %d 0 R /ToUnicode %d 0 R >>"
+            % (base_font, len(subset) - 1, widths, descriptor, to_unicode))
+
+    def close(self):
+        """
+        Embeds the font subsets and writes the remaining objects of the document. A document
+        without pages gets a single empty page, because a PDF document needs at least one page.
+        """
+        if not self._pages:
+            self.add_page(b"")
+        fonts = b" ".join(b"/%s+%d %d 0 R" % (FONT_NAME.encode("ascii"), n, self._add_subset(n, subset))
+                          for n, subset in enumerate(self.encoding.subsets))
+        self.writer.add_object(b"<< /Font << %s >> /ProcSet [/PDF /Text] >>" % fonts, self._objects["resources"])
+        self.writer.add_object(b"<< /Type /Pages /Count %d /Kids [%s] >>"
+                               % (len(self._pages), b" ".join(b"%d 0 R" % page for page in self._pages)),
+                               self._objects["pages"])
+        root = self.writer.add_object(b"<< /Type /Catalog /Pages %d 0 R >>" % self._objects["pages"])
+        self.writer.close(root, self._objects["info"])
@@ -0,0 +1,272 @@
+"""
+File containing a compact lookup table that maps every Dutch postal code to its streets and city,
+so that misspelled street and city names can be corrected without querying the georegister
+
+The table is stored in the input directory, like the BAG index. It can be created from a CSV extract
+of the BAG with:
+    python postcodes.py <extract.csv> [--input <input directory>]
+"""
+
+import argparse
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+from bag import read_extract
+from util import input_files
+
+# The file in the input directory that contains the table that is used by the application
+POSTCODE_TABLE_FILE = "postcodes.bin"
+
+MAGIC = b"THPCTB02"
+# Magic, number of postal codes, number of rows, number of house numbers, number of strings, size of the string blob
+HEADER = struct.Struct("<8sIIIII")
+# The integer arrays in the table, in the order in which they are stored
+ARRAYS = ("postal_codes", "starts", "streets", "cities", "number_starts", "numbers", "offsets")
+
+
+def encode_postal_code(postal_code: str) -> int:
+    """
+    Encodes a Dutch postal code as an integer, preserving the order of the postal codes.
+
+    Parameters
+    ----------
+    postal_code: str
+        The postal code, formatted as four digits followed by two upper-case letters
+
+    Returns
+    -------
+    int:
+        The encoded postal code, or -1 if it is not a valid Dutch postal code
+    """
+    if len(postal_code) != 6 or not postal_code[:4].isdigit() or not postal_code[4:].isalpha() \
+            or not postal_code[4:].isascii():
+        return -1
+    return int(postal_code[:4]) * 676 + (ord(postal_code[4]) - 65) * 26 + (ord(postal_code[5]) - 65)
+
+
+def _house_numbers(addresses: set) -> dict:
+    # Collect the house numbers of every street and city within a postal code
+    house_numbers = {}
+    for postal_code, house_number, _, street, city in addresses:
+        key = (encode_postal_code(postal_code.decode("ascii")), street, city)
+        house_numbers.setdefault(key, set()).add(house_number)
+    return house_numbers
+
+
+def build_table(extract_file: str, table_file: str) -> int:
+    """
+    Converts a CSV extract of the BAG into a postal code table.
+
+    Parameters
+    ----------
+    extract_file: str
+        The CSV file containing the BAG addresses
+    table_file: str
+        The file that the table is written to
+
+    Returns
+    -------
+    int:
+        The number of postal codes in the table
+    """
+    strings, addresses = read_extract(extract_file)
+    names = sorted(strings, key=strings.get)
+
+    arrays = {name: array("I") for name in ARRAYS}
+    for (postal_code, street, city), house_numbers in sorted(_house_numbers(addresses).items()):
+        if not arrays["postal_codes"] or arrays["postal_codes"][-1] != postal_code:
+            arrays["postal_codes"].append(postal_code)
+            arrays["starts"].append(len(arrays["streets"]))
+        arrays["streets"].append(street)
+        arrays["cities"].append(city)
+        arrays["number_starts"].append(len(arrays["numbers"]))
+        arrays["numbers"].extend(sorted(house_numbers))
+    arrays["starts"].append(len(arrays["streets"]))
+    arrays["number_starts"].append(len(arrays["numbers"]))
+
+    encoded = [name.encode("utf8") for name in names]
+    arrays["offsets"].append(0)
+    for name in encoded:
+        arrays["offsets"].append(arrays["offsets"][-1] + len(name))
+
+    directory = os.path.dirname(table_file)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(table_file, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(arrays["postal_codes"]), len(arrays["streets"]), len(arrays["numbers"]),
+                               len(encoded), arrays["offsets"][-1]))
+        for name in ARRAYS:
+            if sys.byteorder == "big":
+                arrays[name].byteswap()
+            file.write(arrays[name].tobytes())
+        file.write(b"".join(encoded))
+    return len(arrays["postal_codes"])
+
+
+class PostcodeTable:
+    """
+    A table that maps Dutch postal codes to the streets and city they belong to, together with the
+    house numbers that exist in every street. The table is stored as a set of flat integer arrays.
+    """
+
+    def __init__(self, table_file: str):
+        with open(table_file, "rb") as file:
+            data = file.read()
+        magic, postal_code_count, row_count, number_count, string_count, blob_size = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{table_file} is not a postal code table")
+
+        position = HEADER.size
+        self._arrays = {}
+        sizes = (postal_code_count, postal_code_count + 1, row_count, row_count, row_count + 1, number_count,
+                 string_count + 1)
+        for name, size in zip(ARRAYS, sizes):
+            self._arrays[name] = array("I")
+            self._arrays[name].frombytes(data[position:position + 4 * size])
+            if sys.byteorder == "big":
+                self._arrays[name].byteswap()
+            position += 4 * size
+        self._strings = data[position:position + blob_size]
+
+    def name(self, string_id: int) -> str:
+        """
+        Retrieves a street or city name from the table.
+
+        Parameters
+        ----------
+        string_id: int
+            The id of the string
+
+        Returns
+        -------
+        str:
+            The street or city name
+        """
+        offsets = self._arrays["offsets"]
+        return self._strings[offsets[string_id]:offsets[string_id + 1]].decode("utf8")
+
+    def has_house_number(self, row: int, house_number: int) -> bool:
+        """
+        Checks whether a house number exists in a street of the table.
+
+        Parameters
+        ----------
+        row: int
+            The row of the street
+        house_number: int
+            The house number
+
+        Returns
+        -------
+        bool:
+            True if an address with this house number exists in the street
+        """
+        numbers, number_starts = self._arrays["numbers"], self._arrays["number_starts"]
+        i = bisect_left(numbers, house_number, number_starts[row], number_starts[row + 1])
+        return i < number_starts[row + 1] and numbers[i] == house_number
+
+    def find(self, postal_code: str, house_number: int, street: str = None, city: str = None) -> list:
+        """
+        Finds the streets in a postal code that contain the given house number.
+
+        Parameters
+        ----------
+        postal_code: str
+            The postal code, formatted as four digits followed by two upper-case letters
+        house_number: int
+            The house number
+        street: str
+            If given, only streets with this name (ignoring case) are returned
+        city: str
+            If given, only streets in this city (ignoring case) are returned
+
+        Returns
+        -------
+        list:
+            A list of (street, city) tuples
+        """
+        code = encode_postal_code(postal_code)
+        postal_codes, starts = self._arrays["postal_codes"], self._arrays["starts"]
+        i = bisect_left(postal_codes, code)
+        if code < 0 or i == len(postal_codes) or postal_codes[i] != code:
+            return []
+        matches = []
+        for row in range(starts[i], starts[i + 1]):
+            if not self.has_house_number(row, house_number):
+                continue
+            match = (self.name(self._arrays["streets"][row]), self.name(self._arrays["cities"][row]))
+            if (street is None or match[0].lower() == street.lower()) \
+                    and (city is None or match[1].lower() == city.lower()):
+                matches.append(match)
+        return matches
+
+
+@lru_cache(maxsize=None)
+def get_table(table_file: str):
+    """
+    Loads the postal code table the first time it is needed.
+
+    Parameters
+    ----------
+    table_file: str
+        The location of the table
+
+    Returns
+    -------
+    PostcodeTable
+        The table, if the data file exists
+    None
+        If the data file does not exist
+    """
+    try:
+        return PostcodeTable(table_file)
+    except FileNotFoundError:
+        return None
+
+
+def resolve_postal_code(postal_code: str, house_number: str, street: str = None, city: str = None):
+    """
+    Finds the street and city of an address locally, if its postal code and house number identify
+    exactly one street.
+
+    Parameters
+    ----------
+    postal_code: str
+        The postal code, formatted as four digits followed by two upper-case letters
+    house_number: str
+        The house number
+    street: str
+        If given, the street name that the address should have
+    city: str
+        If given, the city that the address should be in
+
+    Returns
+    -------
+    (str, str)
+        A tuple containing the street and city, if exactly one street matches
+    None
+        If there is no table, or no unique match
+    """
+    table = get_table(input_files.path(POSTCODE_TABLE_FILE))
+    if table is None or not house_number.isdigit():
+        return None
+    matches = table.find(postal_code, int(house_number), street, city)
+    return matches[0] if len(matches) == 1 else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Creates the postal code table from a CSV extract of the BAG.")
+    parser.add_argument("extract", help="the CSV file containing the BAG addresses")
+    parser.add_argument("table", nargs="?", default=None,
+                        help=f"the file that the table is written to (default: {POSTCODE_TABLE_FILE} in the input "
+                             f"directory)")
+    parser.add_argument("--input", default="input",
+                        help="the input directory of the application, see main.py (default: input)")
+    args = parser.parse_args()
+    if args.table is None:
+        args.table = os.path.join(args.input, POSTCODE_TABLE_FILE)
+    print(f"Stored {build_table(args.extract, args.table)} postal codes in {args.table}")
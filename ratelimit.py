@@ -0,0 +1,231 @@
+"""
+File containing a rate limiter for the Google Geocoding API, which is shared by all threads and by
+the asynchronous engine. It limits the number of requests per second with a token bucket, waits
+longer and longer while Google answers OVER_QUERY_LIMIT, and stops the run when its budget of
+requests is spent, so that both the cost and the duration of a run are predictable.
+"""
+
+import threading
+import time
+
+from util import lazy_import
+
+# Asyncio is only imported when the asynchronous engine is used
+asyncio = lazy_import("asyncio")
+
+# The number of requests per second that are sent to the Google Geocoding API, which allows 50
+GOOGLE_QPS = 25
+# The number of requests that can be sent at once after a quiet period
+GOOGLE_BURST = 10
+# The number of times that a request is sent while Google answers OVER_QUERY_LIMIT
+GOOGLE_ATTEMPTS = 5
+# The number of seconds that no requests are sent after the first OVER_QUERY_LIMIT, which doubles
+# for every next one until a request succeeds
+INITIAL_BACKOFF = 1.0
+MAX_BACKOFF = 32.0
+
+
+class QuotaExceededException(Exception):
+    """
+    Exception indicating that no more requests may be sent to the Google Geocoding API in this run
+    """
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = f"Failed to check entries: {message}"
+
+
+class Clock:
+    """
+    The time source of a rate limiter, which measures and waits in real time.
+    """
+
+    @staticmethod
+    def now() -> float:
+        """
+        Returns the current time.
+
+        Returns
+        -------
+        float:
+            The current time in seconds, which only increases
+        """
+        return time.monotonic()
+
+    @staticmethod
+    def sleep(seconds: float):
+        """
+        Blocks the current thread for a while.
+
+        Parameters
+        ----------
+        seconds: float
+            The number of seconds to wait
+        """
+        time.sleep(seconds)
+
+    @staticmethod
+    async def sleep_async(seconds: float):
+        """
+        Waits for a while without blocking the event loop.
+
+        Parameters
+        ----------
+        seconds: float
+            The number of seconds to wait
+        """
+        await asyncio.sleep(seconds)
+
+
+class RateLimiter:  # pylint: disable=too-many-instance-attributes
+    """
+    A thread-safe token bucket. Every request takes a token; tokens are added at a fixed rate, up
+    to GOOGLE_BURST tokens. A request that finds no token reserves the next one and waits until it
+    is added, so waiting requests are sent in the order in which they arrived.
+    """
+
+    def __init__(self, rate: float = GOOGLE_QPS, budget: int = None, clock: Clock = None):
+        self._lock = threading.Lock()
+        # The clock can be replaced, so that the limiter can be tested without waiting
+        self.clock = clock if clock is not None else Clock()
+        self.configure(rate, budget)
+
+    def configure(self, rate: float = GOOGLE_QPS, budget: int = None):
+        """
+        Changes the limits, and starts counting the requests from zero.
+
+        Parameters
+        ----------
+        rate: float
+            The number of requests per second, or None to send requests as fast as possible
+        budget: int
+            The maximum number of requests, or None to send any number of requests
+        """
+        with self._lock:
+            self.rate = rate
+            self.budget = budget
+            self.calls = 0
+            self.pauses = 0
+            # The time at which the bucket is full again, if no more tokens are taken
+            self._schedule = 0.0
+            # The end of the current pause and the length of the next pause after OVER_QUERY_LIMIT
+            self._pause = (0.0, INITIAL_BACKOFF)
+
+    def _tolerance(self) -> float:
+        # The time that it takes to add all but one of the tokens of a full bucket
+        return (GOOGLE_BURST - 1) / self.rate if self.rate is not None else 0.0
+
+    def reserve(self) -> float:
+        """
+        Takes a token for a request.
+
+        Raises
+        ------
+        QuotaExceededException
+            If the budget of requests is spent
+
+        Returns
+        -------
+        float:
+            The number of seconds to wait before the request may be sent
+        """
+        with self._lock:
+            if self.budget is not None and self.calls >= self.budget:
+                raise QuotaExceededException(f"the budget of {self.budget} Google API request(s) is spent")
+            self.calls += 1
+            return self._take(self.clock.now())
+
+    def _take(self, now: float) -> float:
+        # Takes the next token and returns the time to wait for it, the lock must be held
+        full = max(self._schedule, now)
+        self._schedule = full + (1 / self.rate if self.rate is not None else 0.0)
+        return max(0.0, full - self._tolerance() - now)
+
+    def _resume(self) -> float:
+        """
+        Checks whether requests were paused while a request was waiting for its token. A token that
+        was reserved before the pause may not be used during the pause, so a new token is taken
+        instead, without counting the request again.
+
+        Returns
+        -------
+        float:
+            The number of seconds to wait for the new token, or 0 if the request may be sent
+        """
+        with self._lock:
+            now = self.clock.now()
+            if now >= self._pause[0]:
+                return 0.0
+            return max(self._take(now), self._pause[0] - now)
+
+    @staticmethod
+    def attempts():
+        """
+        Counts the attempts to send a request while Google answers OVER_QUERY_LIMIT.
+
+        Raises
+        ------
+        QuotaExceededException
+            After the last attempt
+
+        Yields
+        ------
+        int
+            The number of the attempt, starting at 0
+        """
+        yield from range(GOOGLE_ATTEMPTS)
+        raise QuotaExceededException(f"Google answered OVER_QUERY_LIMIT {GOOGLE_ATTEMPTS} times in a row")
+
+    def acquire(self):
+        """
+        Waits until a request may be sent, see reserve. If requests are paused in the meantime, it
+        waits until the pause ends.
+        """
+        wait = self.reserve()
+        while wait > 0:
+            self.clock.sleep(wait)
+            wait = self._resume()
+
+    async def acquire_async(self):
+        """
+        Waits until a request may be sent without blocking the event loop, see acquire.
+        """
+        wait = self.reserve()
+        while wait > 0:
+            await self.clock.sleep_async(wait)
+            wait = self._resume()
+
+    def over_query_limit(self):
+        """
+        Stops sending requests for a while, because Google answered OVER_QUERY_LIMIT. The pause
+        doubles every time, unless requests are already paused.
+        """
+        with self._lock:
+            now = self.clock.now()
+            until, backoff = self._pause
+            if now >= until:
+                self.pauses += 1
+                self._pause = (now + backoff, min(backoff * 2, MAX_BACKOFF))
+                self._schedule = max(self._schedule, now + backoff + self._tolerance())
+
+    def succeeded(self):
+        """
+        Resets the length of the pause after OVER_QUERY_LIMIT, because Google answered a request.
+        """
+        with self._lock:
+            self._pause = (self._pause[0], INITIAL_BACKOFF)
+
+    def stats(self) -> str:
+        """
+        Returns a human-readable summary of the requests.
+
+        Returns
+        -------
+        str:
+            A string containing the number of requests and pauses
+        """
+        budget = f" of {self.budget}" if self.budget is not None else ""
+        return f"{self.calls}{budget} request(s), {self.pauses} pause(s) for OVER_QUERY_LIMIT"
+
+
+google_limiter = RateLimiter()
@@ -0,0 +1,215 @@
+"""
+File containing functionality to measure a run of the application: the wall time, CPU time and
+peak memory of every stage, and the number of requests and their latencies for every external
+endpoint. The measurements are written to a JSON file in the output directory.
+"""
+
+import datetime
+import json
+import math
+import os
+import platform
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# The file in the output directory that the report is written to
+REPORT_FILE = "run_report.json"
+# The latency percentiles that are reported for every endpoint
+PERCENTILES = (50, 90, 95, 99)
+# Linux keeps the peak memory of a process in this file, and resets it when 5 is written to CLEAR_REFS
+PROC_STATUS = "/proc/self/status"
+CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def cpu_time() -> float:
+    """
+    Returns the CPU time used by this process and by its child processes that finished, such as
+    the workers of a process pool.
+
+    Returns
+    -------
+    float:
+        The CPU time in seconds
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def peak_memory() -> int:
+    """
+    Returns the largest amount of memory that this process used so far, or since it was last reset
+    with reset_peak_memory.
+
+    Returns
+    -------
+    int:
+        The peak resident memory in bytes
+    None
+        If the peak memory can not be determined on this platform
+    """
+    try:
+        with open(PROC_STATUS, encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    # The size is in bytes on macOS and in kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def reset_peak_memory() -> bool:
+    """
+    Resets the peak memory of this process to the memory that it currently uses, which is only
+    possible on Linux.
+
+    Returns
+    -------
+    bool:
+        True if the peak memory was reset, False if it keeps increasing during the whole process
+    """
+    try:
+        with open(CLEAR_REFS, "w", encoding="ascii") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Returns a percentile of a sorted list of values, using the nearest-rank method.
+
+    Parameters
+    ----------
+    values: list
+        The values, sorted in ascending order
+    percent: float
+        The percentile, from 0 to 100
+
+    Returns
+    -------
+    float:
+        The smallest value that is at least as large as the given percentage of the values
+    """
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+class RunReport:
+    """
+    Collects the measurements of a run. Stages are measured with the stage context manager, and
+    requests are added by the transport that sends them.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.requests = {}
+        self._open = []
+        self._resettable = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measures the code in a with block as a stage of the run. A stage inside another stage is
+        reported with the name of the outer stage in front of its own name.
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage
+        """
+        # The peak memory is reset for every stage where possible, so the peak so far counts for
+        # the stages that are still open
+        for stage in self._open:
+            self._update_peak(stage)
+        self._resettable = reset_peak_memory()
+        stage = {"stage": ".".join([*(outer["stage"] for outer in self._open[-1:]), name]),
+                 "wall": 0.0, "cpu": 0.0, "peak_memory": None}
+        self.stages.append(stage)
+        self._open.append(stage)
+        wall, cpu = time.perf_counter(), cpu_time()
+        try:
+            yield
+        finally:
+            stage["wall"] = round(time.perf_counter() - wall, 4)
+            stage["cpu"] = round(cpu_time() - cpu, 4)
+            self._update_peak(stage)
+            self._open.pop()
+
+    @staticmethod
+    def _update_peak(stage: dict):
+        peak = peak_memory()
+        if peak is not None:
+            stage["peak_memory"] = max(stage["peak_memory"] or 0, peak)
+
+    def request(self, url: str, seconds: float, failed: bool):
+        """
+        Adds a request that was sent to an external endpoint. Requests are grouped by the host and
+        path of their URL, so the query and the API key are not stored.
+
+        Parameters
+        ----------
+        url: str
+            The URL of the request
+        seconds: float
+            The number of seconds until the response was received or the request failed
+        failed: bool
+            Whether the request failed or received an error status
+        """
+        parts = urlsplit(url)
+        with self._lock:
+            latencies, failures = self.requests.get(parts.netloc + parts.path, ([], 0))
+            latencies.append(seconds)
+            self.requests[parts.netloc + parts.path] = (latencies, failures + failed)
+
+    def endpoints(self) -> dict:
+        """
+        Summarizes the requests to every endpoint.
+
+        Returns
+        -------
+        dict:
+            The number of requests, the number of failed requests and the latency percentiles in
+            milliseconds of every endpoint
+        """
+        summary = {}
+        with self._lock:
+            for endpoint, (latencies, failures) in sorted(self.requests.items()):
+                latencies = sorted(latencies)
+                summary[endpoint] = {
+                    "requests": len(latencies), "failures": failures,
+                    "latency_ms": {**{f"p{percent}": round(percentile(latencies, percent) * 1000, 1)
+                                      for percent in PERCENTILES},
+                                   "max": round(latencies[-1] * 1000, 1),
+                                   "mean": round(sum(latencies) / len(latencies) * 1000, 1)}}
+        return summary
+
+    def write(self, file_name: str, version: str):
+        """
+        Writes the report to a JSON file.
+
+        Parameters
+        ----------
+        file_name: str
+            The file that the report is written to
+        version: str
+            The version of the application
+        """
+        report = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "version": version,
+                  "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                  # Without a reset, the peak memory of a stage is the peak of the process until its end
+                  "peak_memory_scope": "stage" if self._resettable else "process",
+                  "stages": self.stages, "endpoints": self.endpoints()}
+        with open(file_name, "w", encoding="utf8") as file:
+            json.dump(report, file, indent=2)
+
+
+run_report = RunReport()
@@ -0,0 +1,163 @@
+"""
+File containing functionality to decide automatically whether addresses that could not be validated
+are kept, using rules that are read from a JSON file
+
+A rules file contains a list of rules, which are tried in order. A rule matches an entry if all of
+its patterns match the corresponding fields of the entry (case-insensitively), for example:
+    [
+        {"name": "Belgian addresses", "country": "Belgium", "decision": "keep"},
+        {"name": "No house number", "address": "[^0-9]*", "decision": "drop"}
+    ]
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from typing import NamedTuple
+
+# The file in the input directory that contains the rules that are used by the application
+RULES_FILE = "review_rules.json"
+# The fields of an entry that a rule can have a pattern for
+FIELDS = ('address', 'address_2', 'postal_code', 'city', 'country')
+DECISIONS = ("keep", "drop")
+
+
+class Rule(NamedTuple):
+    """
+    A rule that decides whether an entry is kept if all of its patterns match the entry completely.
+    """
+    name: str
+    patterns: dict
+    keep: bool
+
+    def matches(self, entry: dict) -> bool:
+        """
+        Checks whether the rule applies to an entry.
+
+        Parameters
+        ----------
+        entry: dict
+            The entry, represented as a dictionary
+
+        Returns
+        -------
+        bool:
+            True if all patterns of the rule match the corresponding fields of the entry
+        """
+        return all(pattern.fullmatch(str(entry[field]).strip()) for field, pattern in self.patterns.items())
+
+
+class RuleSet:
+    """
+    An ordered list of rules, in which the first rule that matches an entry makes the decision. The
+    number of decisions of every rule is counted.
+    """
+
+    def __init__(self, rules: list):
+        self.rules = rules
+        self.counts = Counter()
+
+    def decide(self, entry: dict):
+        """
+        Decides whether an entry is kept, using the first rule that matches the entry.
+
+        Parameters
+        ----------
+        entry: dict
+            The entry, represented as a dictionary
+
+        Returns
+        -------
+        bool
+            True if the entry should be kept, False if it should be dropped
+        None
+            If no rule matches the entry
+        """
+        for position, rule in enumerate(self.rules):
+            if rule.matches(entry):
+                self.counts[position] += 1
+                return rule.keep
+        return None
+
+    def summary(self) -> str:
+        """
+        Returns a human-readable summary of the decisions that were made.
+
+        Returns
+        -------
+        str:
+            A string containing the number of decisions of every rule
+        """
+        return "\n".join(f"Rule '{rule.name}' ({'keep' if rule.keep else 'drop'}): "
+                         f"{self.counts[position]} decision(s)" for position, rule in enumerate(self.rules))
+
+
+def parse_rule(data, position: int) -> Rule:
+    """
+    Parses a single rule from a rules file.
+
+    Parameters
+    ----------
+    data
+        The rule, as read from the JSON file
+    position: int
+        The position of the rule in the file, which is used as its name if it has none
+
+    Raises
+    ------
+    ValueError
+        If the rule is not valid
+
+    Returns
+    -------
+    Rule
+        The parsed rule
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"Rule {position} is not a JSON object")
+    name = str(data.get("name", f"rule {position}"))
+    if data.get("decision") not in DECISIONS:
+        raise ValueError(f"Rule '{name}' should have a decision of either 'keep' or 'drop'")
+    unknown = set(data) - set(FIELDS) - {"name", "decision"}
+    if unknown:
+        raise ValueError(f"Rule '{name}' has unknown field(s): {', '.join(sorted(unknown))}")
+
+    if not any(field in data for field in FIELDS):
+        raise ValueError(f"Rule '{name}' has no patterns")
+    try:
+        return Rule(name, {field: re.compile(str(data[field]), re.IGNORECASE) for field in FIELDS if field in data},
+                    data["decision"] == "keep")
+    except re.error as exc:
+        raise ValueError(f"Rule '{name}' has an invalid pattern: {exc}") from exc
+
+
+def load_rules(rules_file: str) -> RuleSet:
+    """
+    Reads the rules from a rules file, if it exists.
+
+    Parameters
+    ----------
+    rules_file: str
+        The location of the rules file
+
+    Raises
+    ------
+    ValueError
+        If the rules file is not valid
+
+    Returns
+    -------
+    RuleSet
+        The rules in the file, or no rules if the file does not exist
+    """
+    if not os.path.exists(rules_file):
+        return RuleSet([])
+    with open(rules_file, encoding="utf8") as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"No (valid) JSON in {rules_file}") from exc
+    if not isinstance(data, list):
+        raise ValueError(f"{rules_file} should contain a list of rules")
+    return RuleSet([parse_rule(rule, position) for position, rule in enumerate(data, 1)])
@@ -0,0 +1,129 @@
+"""
+Tests for the offline BAG index, which is built from a small extract.
+
+Usage:
+    python -m pytest tests
+"""
+
+import os
+import tempfile
+import unittest
+
+from bag import BagIndex, encode_addition, import_extract
+from util import format_dutch_address
+
+# A CSV extract of the BAG, in the format that NLExtract exports
+EXTRACT = """openbareruimte;huisnummer;huisletter;huisnummertoevoeging;postcode;woonplaats
+Kerkstraat;1;;;6525AB;Nijmegen
+Kerkstraat;1;A;;6525AB;Nijmegen
+Kerkstraat;1;;2;6525AB;Nijmegen
+Kerkstraat;3;;ééé;6525 AB;Nijmegen
+Molenweg;1;;;6525AB;Nijmegen
+Kerkstraat;1;;;1234CD;Ergens
+"""
+
+
+class BagIndexTest(unittest.TestCase):
+    """
+    Tests the answers of an index that is built from EXTRACT.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        extract_file = os.path.join(cls.directory.name, "extract.csv")
+        with open(extract_file, "w", encoding="utf8") as file:
+            file.write(EXTRACT)
+        cls.size = import_extract(extract_file, os.path.join(cls.directory.name, "bag_index.bin"))
+        cls.index = BagIndex(os.path.join(cls.directory.name, "bag_index.bin"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def query(self, address: str, postal_code: str = None, city: str = None) -> list:
+        """
+        Looks up an address in the index like the validation does, by splitting it first.
+
+        Parameters
+        ----------
+        address: str
+            The street and house number
+        postal_code: str
+            The postal code, or None to search on street and city
+        city: str
+            The city
+
+        Returns
+        -------
+        list:
+            The street, house number, postal code and city of every address that is found
+        """
+        street, house_number, house_number_extra = format_dutch_address(address)
+        response = self.index.query(street, house_number, postal_code, city, house_number_extra)
+        return [(doc["straatnaam"], doc["huis_nlt"], doc["postcode"], doc["woonplaatsnaam"])
+                for doc in response["docs"]]
+
+    def test_size(self):
+        """
+        Every address in the extract is imported.
+        """
+        self.assertEqual(self.size, len(EXTRACT.splitlines()) - 1)
+        self.assertEqual(self.index.size, self.size)
+
+    def test_house_number_letter(self):
+        """
+        A house letter matches whether it is written attached, lower-case or with a dash.
+        """
+        for address in ("Kerkstraat 1A", "Kerkstraat 1a", "Kerkstraat 1-A"):
+            self.assertEqual(self.query(address, "6525 AB", "Nijmegen"),
+                             [("Kerkstraat", "1A", "6525AB", "Nijmegen")], address)
+
+    def test_house_number_addition(self):
+        """
+        A house number addition is stored after a dash, and matches with or without it.
+        """
+        self.assertEqual(self.query("Kerkstraat 1-2", "6525AB", "Nijmegen"),
+                         [("Kerkstraat", "1-2", "6525AB", "Nijmegen")])
+        self.assertEqual(self.index.query("Kerkstraat", "1", "6525AB", "Nijmegen", "2")["docs"][0]["huis_nlt"], "1-2")
+
+    def test_house_number_without_extra(self):
+        """
+        Without an extra part, every address with the house number on the street is found.
+        """
+        self.assertEqual(sorted(doc[1] for doc in self.query("Kerkstraat 1", "6525AB", "Nijmegen")),
+                         ["1", "1-2", "1A"])
+        self.assertIsNone(self.index.query("Kerkstraat", "1A", "6525AB", "Nijmegen"))
+
+    def test_case_insensitive(self):
+        """
+        Street and city names match regardless of their case, both when searching on the postal
+        code and when searching on the street and city. The names are returned as in the extract.
+        """
+        expected = [("Molenweg", "1", "6525AB", "Nijmegen")]
+        self.assertEqual(self.query("MOLENWEG 1", "6525ab", "nijmegen"), expected)
+        self.assertEqual(self.query("molenweg 1", None, "NIJMEGEN"), expected)
+        self.assertEqual(self.query("kerkstraat 1A", None, "nijmegen"), [("Kerkstraat", "1A", "6525AB", "Nijmegen")])
+        self.assertEqual(self.query("Kerkstraat 1", None, "ergens"), [("Kerkstraat", "1", "1234CD", "Ergens")])
+
+    def test_filters(self):
+        """
+        Addresses on another street, in another city or with another addition are not returned.
+        """
+        self.assertEqual(self.query("Dorpsstraat 1", "6525AB", "Nijmegen"), [])
+        self.assertEqual(self.query("Kerkstraat 1", "6525AB", "Ergens"), [])
+        self.assertEqual(self.query("Kerkstraat 1B", "6525AB", "Nijmegen"), [])
+        self.assertEqual(self.query("Kerkstraat 2", "6525AB", "Nijmegen"), [])
+
+    def test_long_addition(self):
+        """
+        An addition that does not fit in a record is shortened by whole characters.
+        """
+        self.assertEqual(encode_addition("-ééé"), "-éé".encode("utf8"))
+        self.assertEqual(encode_addition("-A"), b"-A")
+        self.assertEqual(self.query("Kerkstraat 3", "6525AB", "Nijmegen"),
+                         [("Kerkstraat", "3-éé", "6525AB", "Nijmegen")])
+
+
+if __name__ == "__main__":
+    unittest.main()
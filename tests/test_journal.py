@@ -0,0 +1,151 @@
+"""
+Tests for resuming an interrupted run from the validation journal.
+
+Usage:
+    python -m pytest tests
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+import checker
+from cache import LEDGER_TTL, ledger
+from correction import correct_entries
+from journal import JOURNAL_FILE
+from transport import ReplayTransport, network, redact
+from util import input_files, lazy_import
+
+pd = lazy_import("pandas")
+
+# The streets of the entries, where the first one is valid, the second one is corrected and the
+# last one does not exist
+STREETS = ("Kerkstraat", "Wrongstraat", "Nowhere")
+# The number of entries, some of which share their address
+ENTRIES = 30
+# The number of entries that were completed before the run was interrupted
+COMPLETED = 12
+
+
+def make_entries() -> pd.DataFrame:
+    """
+    Creates the input entries.
+
+    Returns
+    -------
+    pd.DataFrame:
+        A dataframe containing the entries
+    """
+    return pd.DataFrame([{"first_name": f"Member {i}", "last_name": "Test",
+                          "address": f"{STREETS[i % len(STREETS)]} {i % 7 + 1}", "address_2": "",
+                          "postal_code": "6525 AB", "city": "Nijmegen", "country": "Netherlands"}
+                         for i in range(ENTRIES)])
+
+
+class JournalResumeTest(unittest.TestCase):
+    """
+    Tests that a resumed run only validates the entries that are not in the journal, and has the
+    same result as a run that was not interrupted.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.previous_input = input_files.directory
+        input_files.use(os.path.join(self.directory.name, "input"))
+        os.makedirs(input_files.directory)
+        with open(input_files.path(checker.CREDENTIALS_FILE), "w", encoding="utf8") as file:
+            json.dump({"google_maps_api_key": "test"}, file)
+        # The API key is checked with a request to Google, which is answered from a cassette
+        cassette = os.path.join(self.directory.name, "cassette.jsonl")
+        with open(cassette, "w", encoding="utf8") as file:
+            json.dump({"url": redact(f"{checker.GOOGLE_GEOCODE_URL}?address=a&key=test"), "status": 200,
+                       "body": json.dumps({"status": "ZERO_RESULTS", "results": []}), "elapsed": 0}, file)
+        self.previous_transport = network.use(ReplayTransport(cassette))
+        self.validated = []
+
+    def tearDown(self):
+        network.use(self.previous_transport)
+        input_files.use(self.previous_input)
+        self.directory.cleanup()
+
+    def validate(self, _api_key: str, entries: list):
+        """
+        Validates entries without any lookups, and remembers which entries were validated.
+
+        Parameters
+        ----------
+        _api_key: str
+            The API key, which is not used
+        entries: list
+            The entries to validate, represented as dictionaries
+
+        Yields
+        ------
+        (str, dict, str)
+            The outcome of the validation of each entry, see checker.validate_entry
+        """
+        for entry in entries:
+            self.validated.append(entry["first_name"])
+            if entry["address"].startswith("Nowhere"):
+                yield "INVALID", entry, "GEODATA_NOT_FOUND"
+            else:
+                yield "VALID", dict(entry, address=entry["address"].replace("Wrong", "Goed")), None
+
+    def run_correction(self, name: str, resume: bool = False) -> (tuple, pd.DataFrame, dict):
+        """
+        Corrects the entries with an output directory and a ledger of its own, so that only the
+        journal is shared between runs that use the same output directory.
+
+        Parameters
+        ----------
+        name: str
+            The name of the output directory
+        resume: bool
+            Whether the run is resumed
+
+        Returns
+        -------
+        (tuple, pd.DataFrame, dict)
+            The numbers of invalid and changed entries, the corrected entries and the contents of
+            the log files
+        """
+        output_dir = os.path.join(self.directory.name, name)
+        os.makedirs(output_dir, exist_ok=True)
+        ledger.configure(os.path.join(output_dir, f"ledger{len(os.listdir(output_dir))}.sqlite"), LEDGER_TTL)
+        entries = make_entries()
+        result = correct_entries(entries, output_dir, self.validate, resume, "drop")
+        logs = {}
+        for log in ("invalid_entries.log", "changed_entries.log"):
+            with open(os.path.join(output_dir, log), encoding="utf8") as file:
+                logs[log] = file.read()
+        return result, entries, logs
+
+    def test_resume(self):
+        """
+        Only the entries after the completed part of the journal are validated, and a line that was
+        only partially written is replaced.
+        """
+        result, entries, logs = self.run_correction("full")
+        with open(os.path.join(self.directory.name, "full", JOURNAL_FILE), "rb") as file:
+            journal = file.readlines()
+        self.assertEqual(len(journal), ENTRIES)
+
+        os.makedirs(os.path.join(self.directory.name, "resumed"))
+        with open(os.path.join(self.directory.name, "resumed", JOURNAL_FILE), "wb") as file:
+            file.writelines(journal[:COMPLETED])
+            file.write(journal[COMPLETED][:len(journal[COMPLETED]) // 2])
+        self.validated.clear()
+        resumed_result, resumed_entries, resumed_logs = self.run_correction("resumed", resume=True)
+
+        self.assertTrue(self.validated)
+        self.assertFalse(set(self.validated) & {f"Member {i}" for i in range(COMPLETED)})
+        self.assertEqual(resumed_result, result)
+        pd.testing.assert_frame_equal(resumed_entries, entries)
+        self.assertEqual(resumed_logs, logs)
+        with open(os.path.join(self.directory.name, "resumed", JOURNAL_FILE), "rb") as file:
+            self.assertEqual(file.readlines(), journal)
+
+
+if __name__ == "__main__":
+    unittest.main()
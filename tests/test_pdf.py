@@ -0,0 +1,149 @@
+"""
+Tests for the PDF files that are written with the built-in PDF writer.
+
+Usage:
+    python -m pytest tests
+"""
+
+import os
+import re
+import tempfile
+import unittest
+
+from pdf import ITEMS_PER_PAGE, generate_pdf_native, generate_pdf_sharded
+
+# The size in bytes of an entry in the cross-reference table
+XREF_ENTRY_SIZE = 20
+
+
+def make_entries(count: int) -> list:
+    """
+    Creates entries to put on labels.
+
+    Parameters
+    ----------
+    count: int
+        The number of entries
+
+    Returns
+    -------
+    list:
+        The entries, represented as dictionaries
+    """
+    return [{"first_name": f"Member {i}", "last_name": "Tést", "address": f"Kerkstraat {i + 1}", "address_2": "",
+             "postal_code": "6525 AB", "city": "Nijmegen", "country": "Belgium" if i % 2 else "Netherlands"}
+            for i in range(count)]
+
+
+def read_objects(data: bytes) -> (dict, int):
+    """
+    Reads the objects of a PDF file at the offsets in its cross-reference table.
+
+    Parameters
+    ----------
+    data: bytes
+        The contents of the PDF file
+
+    Raises
+    ------
+    ValueError
+        If the cross-reference table or the trailer can not be found
+
+    Returns
+    -------
+    (dict, int)
+        A tuple containing the body of every object by its number, or None if the object does not
+        start at its offset, and the number of the document catalog
+    """
+    start = int(data[data.rindex(b"startxref") + len(b"startxref"):].split()[0])
+    header = re.match(rb"xref\n0 (\d+)\n0000000000 65535 f \n", data[start:])
+    trailer = re.search(rb"trailer\n<< /Size (\d+) /Root (\d+) 0 R", data[start:])
+    if header is None or trailer is None or header.group(1) != trailer.group(1):
+        raise ValueError("startxref does not point to a valid cross-reference table")
+
+    objects = {}
+    for number in range(1, int(header.group(1))):
+        entry = data[start + header.end() + XREF_ENTRY_SIZE * (number - 1):][:XREF_ENTRY_SIZE]
+        offset = int(entry[:10]) if re.fullmatch(rb"\d{10} 00000 n \n", entry) else -1
+        found = offset >= 0 and data[offset:].startswith(b"%d 0 obj\n" % number)
+        objects[number] = data[offset:data.index(b"\nendobj\n", offset)] if found else None
+    return objects, int(trailer.group(2))
+
+
+class NativePdfTest(unittest.TestCase):
+    """
+    Tests the structure of the PDF files, by following the cross-reference table to the page tree.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assert_pages(self, data: bytes, pages: int):
+        """
+        Checks that every object is where the cross-reference table says it is, and that the page
+        tree contains the expected number of pages.
+
+        Parameters
+        ----------
+        data: bytes
+            The contents of the PDF file
+        pages: int
+            The expected number of pages
+        """
+        self.assertTrue(data.startswith(b"%PDF-1.4\n"))
+        self.assertTrue(data.endswith(b"%%EOF\n"))
+        objects, root = read_objects(data)
+        for number, body in objects.items():
+            self.assertIsNotNone(body, f"object {number} is not at its offset in the cross-reference table")
+
+        tree = int(re.search(rb"/Pages (\d+) 0 R", objects[root]).group(1))
+        count, kids = re.search(rb"/Type /Pages /Count (\d+) /Kids \[([^\]]*)\]", objects[tree]).groups()
+        kids = [int(kid) for kid in re.findall(rb"(\d+) 0 R", kids)]
+        self.assertEqual(int(count), pages)
+        self.assertEqual(len(kids), pages)
+        for kid in kids:
+            self.assertIn(b"/Type /Page /Parent %d 0 R" % tree, objects[kid])
+
+    def generate(self, generator, count: int) -> bytes:
+        """
+        Writes the labels of a number of entries to a PDF file.
+
+        Parameters
+        ----------
+        generator
+            The function that writes the PDF file, such as generate_pdf_native
+        count: int
+            The number of entries
+
+        Returns
+        -------
+        bytes:
+            The contents of the PDF file
+        """
+        out_file = os.path.join(self.directory.name, "labels.pdf")
+        self.assertEqual(generator(make_entries(count), out_file), count)
+        with open(out_file, "rb") as file:
+            return file.read()
+
+    def test_pages(self):
+        """
+        Every page is referred to by the page tree, including a page that is only partially filled.
+        """
+        self.assert_pages(self.generate(generate_pdf_native, ITEMS_PER_PAGE), 1)
+        self.assert_pages(self.generate(generate_pdf_native, ITEMS_PER_PAGE + 1), 2)
+        self.assert_pages(self.generate(generate_pdf_sharded, 3 * ITEMS_PER_PAGE), 3)
+
+    def test_no_entries(self):
+        """
+        Without entries, the file contains a single empty page, like the file that is written with
+        reportlab.
+        """
+        self.assert_pages(self.generate(generate_pdf_native, 0), 1)
+        self.assert_pages(self.generate(generate_pdf_sharded, 0), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Tests for the rate limiter of the Google Geocoding API.
+
+Usage:
+    python -m pytest tests
+"""
+
+import asyncio
+import unittest
+
+from ratelimit import GOOGLE_BURST, INITIAL_BACKOFF, QuotaExceededException, RateLimiter
+
+# The number of requests per second of the limiters in the tests. The time between tokens is a
+# power of two, so the fake time adds up exactly
+RATE = 64
+
+
+class FakeClock:
+    """
+    A clock that only advances while the limiter waits, and remembers every wait. Something can
+    happen at the start of the next wait, such as another request that is answered with
+    OVER_QUERY_LIMIT while a request waits for its token.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        self.sleeps = []
+        self.on_sleep = None
+
+    def now(self) -> float:
+        """
+        Returns the current time.
+
+        Returns
+        -------
+        float:
+            The number of seconds that were waited in total
+        """
+        return self.time
+
+    def sleep(self, seconds: float):
+        """
+        Advances the clock, after running the function that should happen during the wait.
+
+        Parameters
+        ----------
+        seconds: float
+            The number of seconds to wait
+        """
+        if self.on_sleep is not None:
+            on_sleep, self.on_sleep = self.on_sleep, None
+            on_sleep()
+        self.sleeps.append(seconds)
+        self.time += seconds
+
+    async def sleep_async(self, seconds: float):
+        """
+        Advances the clock like sleep, from a coroutine.
+
+        Parameters
+        ----------
+        seconds: float
+            The number of seconds to wait
+        """
+        self.sleep(seconds)
+
+
+class RateLimiterTest(unittest.TestCase):
+    """
+    Tests when requests are sent, by following the time of a fake clock.
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(rate=RATE, clock=self.clock)
+
+    def send_times(self, requests: int) -> list:
+        """
+        Sends requests one after the other.
+
+        Parameters
+        ----------
+        requests: int
+            The number of requests
+
+        Returns
+        -------
+        list:
+            The time at which every request was sent
+        """
+        times = []
+        for _ in range(requests):
+            self.limiter.acquire()
+            times.append(self.clock.time)
+        return times
+
+    def test_burst(self):
+        """
+        A full bucket sends GOOGLE_BURST requests at once, after which requests are sent at the rate.
+        """
+        times = self.send_times(GOOGLE_BURST + 5)
+        self.assertEqual(times[:GOOGLE_BURST], [0.0] * GOOGLE_BURST)
+        for i, moment in enumerate(times[GOOGLE_BURST:], 1):
+            self.assertAlmostEqual(moment, i / RATE)
+        self.assertEqual(self.limiter.calls, GOOGLE_BURST + 5)
+
+    def test_backoff(self):
+        """
+        Every OVER_QUERY_LIMIT pauses the requests twice as long as the one before, until a request
+        succeeds.
+        """
+        self.limiter.over_query_limit()
+        self.assertAlmostEqual(self.send_times(1)[0], INITIAL_BACKOFF)
+        self.limiter.over_query_limit()
+        self.assertAlmostEqual(self.send_times(1)[0], 3 * INITIAL_BACKOFF)
+        self.limiter.succeeded()
+        self.limiter.over_query_limit()
+        self.assertAlmostEqual(self.send_times(1)[0], 4 * INITIAL_BACKOFF)
+        self.assertEqual(self.limiter.pauses, 3)
+
+    def test_pause_while_waiting(self):
+        """
+        A request that reserved its token before a pause started does not use it during the pause,
+        but waits until the pause is over.
+        """
+        self.send_times(GOOGLE_BURST)
+        self.clock.on_sleep = self.limiter.over_query_limit
+        self.assertAlmostEqual(self.send_times(1)[0], INITIAL_BACKOFF)
+        self.assertEqual(len(self.clock.sleeps), 2)
+        self.assertAlmostEqual(self.clock.sleeps[0], 1 / RATE)
+        self.assertAlmostEqual(self.clock.sleeps[1], INITIAL_BACKOFF - 1 / RATE)
+        self.assertEqual(self.limiter.calls, GOOGLE_BURST + 1)
+
+    def test_async_pause_while_waiting(self):
+        """
+        The same as test_pause_while_waiting, for a request that waits in a coroutine.
+        """
+        async def send():
+            for _ in range(GOOGLE_BURST + 1):
+                await self.limiter.acquire_async()
+
+        self.clock.on_sleep = self.limiter.over_query_limit
+        asyncio.run(send())
+        self.assertAlmostEqual(self.clock.time, INITIAL_BACKOFF)
+        self.assertEqual(len(self.clock.sleeps), 2)
+        self.assertAlmostEqual(self.clock.sleeps[1], INITIAL_BACKOFF - 1 / RATE)
+
+    def test_budget(self):
+        """
+        No more requests are sent than the budget allows.
+        """
+        self.limiter.configure(RATE, 3)
+        self.send_times(3)
+        with self.assertRaises(QuotaExceededException):
+            self.limiter.acquire()
+        self.assertEqual(self.limiter.stats(), "3 of 3 request(s), 0 pause(s) for OVER_QUERY_LIMIT")
+
+
+if __name__ == "__main__":
+    unittest.main()
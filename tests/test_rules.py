@@ -0,0 +1,123 @@
+"""
+Tests for the rules that decide about addresses that could not be validated.
+
+Usage:
+    python -m pytest tests
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from rules import load_rules, parse_rule
+
+# An entry that could not be validated
+ENTRY = {"first_name": "Member", "last_name": "Test", "address": "Rue de la Loi 16", "address_2": "",
+         "postal_code": "1000", "city": "Brussel", "country": "Belgium"}
+
+
+class RulesTest(unittest.TestCase):
+    """
+    Tests how rules match entries, and which rules files are rejected.
+    """
+
+    def load(self, rules: list):
+        """
+        Writes rules to a rules file and reads them again.
+
+        Parameters
+        ----------
+        rules: list
+            The rules, as they are written to the JSON file
+
+        Returns
+        -------
+        RuleSet
+            The rules in the file
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            rules_file = os.path.join(directory, "review_rules.json")
+            with open(rules_file, "w", encoding="utf8") as file:
+                json.dump(rules, file)
+            return load_rules(rules_file)
+
+    def test_full_match(self):
+        """
+        A pattern has to match the whole field, not just a part of it.
+        """
+        self.assertIsNone(self.load([{"country": "Belg", "decision": "keep"}]).decide(ENTRY))
+        self.assertIsNone(self.load([{"address": "[^0-9]*", "decision": "drop"}]).decide(ENTRY))
+        self.assertTrue(self.load([{"country": "Belg.*", "decision": "keep"}]).decide(ENTRY))
+        self.assertFalse(self.load([{"address": "Rue .* [0-9]+", "decision": "drop"}]).decide(ENTRY))
+
+    def test_all_patterns(self):
+        """
+        A rule only matches if the patterns of all its fields match.
+        """
+        rules = self.load([{"country": "Belgium", "city": "Antwerpen", "decision": "drop"}])
+        self.assertIsNone(rules.decide(ENTRY))
+        self.assertFalse(rules.decide(dict(ENTRY, city="Antwerpen")))
+
+    def test_ignore_case(self):
+        """
+        Patterns match regardless of the case of the field.
+        """
+        self.assertTrue(self.load([{"country": "BELGIUM", "decision": "keep"}]).decide(ENTRY))
+        self.assertTrue(self.load([{"city": "brussel", "decision": "keep"}]).decide(dict(ENTRY, city="BRUSSEL")))
+
+    def test_first_match(self):
+        """
+        The first rule that matches decides, and only that rule counts the decision.
+        """
+        rules = self.load([{"name": "Brussels", "city": "Brussel", "decision": "drop"},
+                           {"name": "Belgium", "country": "Belgium", "decision": "keep"}])
+        self.assertFalse(rules.decide(ENTRY))
+        self.assertTrue(rules.decide(dict(ENTRY, city="Antwerpen")))
+        self.assertTrue(rules.decide(dict(ENTRY, city="Gent")))
+        self.assertEqual(rules.summary(), "Rule 'Brussels' (drop): 1 decision(s)\n"
+                                          "Rule 'Belgium' (keep): 2 decision(s)")
+
+    def test_no_rules_file(self):
+        """
+        Without a rules file, no rule decides.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            rules = load_rules(os.path.join(directory, "review_rules.json"))
+        self.assertEqual(rules.rules, [])
+        self.assertIsNone(rules.decide(ENTRY))
+
+    def test_invalid_decision(self):
+        """
+        A rule has to keep or drop the entries it matches.
+        """
+        for decision in ("accept", None, True):
+            with self.assertRaisesRegex(ValueError, "decision"):
+                parse_rule({"country": "Belgium", "decision": decision}, 1)
+        with self.assertRaisesRegex(ValueError, "decision"):
+            self.load([{"country": "Belgium"}])
+
+    def test_unknown_field(self):
+        """
+        A rule with a field that is not an address field is rejected, so that a misspelled field
+        does not silently match every entry.
+        """
+        with self.assertRaisesRegex(ValueError, "unknown field\\(s\\): contry"):
+            self.load([{"name": "Belgium", "contry": "Belgium", "decision": "keep"}])
+        with self.assertRaisesRegex(ValueError, "unknown field\\(s\\): first_name"):
+            parse_rule({"first_name": "Member", "country": "Belgium", "decision": "keep"}, 1)
+
+    def test_invalid_rules(self):
+        """
+        Rules without patterns, with an invalid pattern or in a file that is not a list are rejected.
+        """
+        with self.assertRaisesRegex(ValueError, "no patterns"):
+            parse_rule({"decision": "keep"}, 1)
+        with self.assertRaisesRegex(ValueError, "invalid pattern"):
+            parse_rule({"city": "(", "decision": "keep"}, 1)
+        with self.assertRaisesRegex(ValueError, "list of rules"):
+            self.load({"country": "Belgium", "decision": "keep"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Tests for the asynchronous HTTP client, against the stub server of the benchmarks.
+
+Usage:
+    python -m pytest tests
+"""
+
+import asyncio
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from benchmarks.stub_server import GEOREGISTER_PATH, StubHandler
+from transport import AsyncHttpClient
+
+# The query that is sent to the imitated georegister
+GEOREGISTER_QUERY = GEOREGISTER_PATH + "?q=A&fq=postcode:6525AB&fq=huisnummer:1"
+# The suffix of a query after which the connection is closed
+CLOSE_SUFFIX = "&close"
+# The chunks of the body that is sent with chunked transfer encoding
+CHUNKS = (b"Hello", b", ", b"world")
+# The number of bytes of a truncated response that are announced, and that are actually sent
+TRUNCATED_LENGTH = 100
+TRUNCATED_SENT = 10
+
+
+class EdgeCaseHandler(StubHandler):
+    """
+    Adds the responses that the imitated endpoints never send to the stub server, and remembers
+    which connections the requests were received on.
+    """
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Answers a GET request.
+        """
+        self.server.connections.add(self.client_address)
+        if self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for index, chunk in enumerate(CHUNKS):
+                # The first chunk has an extension, which has to be ignored
+                self.wfile.write(f"{len(chunk):x}{';name=value' if index == 0 else ''}\r\n".encode("ascii"))
+                self.wfile.write(chunk + b"\r\n")
+            self.wfile.write(b"0\r\nX-Trailer: value\r\n\r\n")
+        elif self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", GEOREGISTER_QUERY)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/truncated":
+            self.send_response(200)
+            self.send_header("Content-Length", str(TRUNCATED_LENGTH))
+            self.end_headers()
+            self.wfile.write(b"x" * TRUNCATED_SENT)
+            self.close_connection = True
+        else:
+            super().do_GET()
+            # The connection is closed after the response without telling the client
+            self.close_connection = self.path.endswith(CLOSE_SUFFIX)
+
+
+class AsyncHttpClientTest(unittest.TestCase):
+    """
+    Tests the responses that the client has to understand, and the reuse of connections.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), EdgeCaseHandler)
+        cls.server.connections = set()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.connections.clear()
+
+    def get_all(self, *paths: str) -> list:
+        """
+        Sends requests for the paths one after the other with the same client.
+
+        Parameters
+        ----------
+        paths: str
+            The paths of the requests
+
+        Returns
+        -------
+        list:
+            The status code and the body of every response
+        """
+        async def send():
+            # Requests through a proxy are not sent by the client itself
+            with mock.patch("urllib.request.getproxies", return_value={}):
+                client = AsyncHttpClient(1)
+            try:
+                return [await client.get(self.url + path) for path in paths]
+            finally:
+                await client.close()
+
+        return asyncio.run(send())
+
+    def test_content_length(self):
+        """
+        The body of a response with a Content-Length header is read completely, and the connection
+        is used for the next request.
+        """
+        responses = self.get_all(GEOREGISTER_QUERY, GEOREGISTER_QUERY)
+        self.assertEqual([status for status, _ in responses], [200, 200])
+        self.assertEqual(json.loads(responses[0][1])["response"]["docs"][0]["postcode"], "6525AB")
+        self.assertEqual(responses[0][1], responses[1][1])
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_chunked(self):
+        """
+        The chunks of a body with chunked transfer encoding are joined, and the trailer is skipped,
+        so that the connection can be used for the next request.
+        """
+        responses = self.get_all("/chunked", "/chunked")
+        self.assertEqual(responses, [(200, b"".join(CHUNKS))] * 2)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_redirect(self):
+        """
+        A redirect is followed, and the response that it leads to is returned.
+        """
+        (status, body), = self.get_all("/redirect")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.get_all(GEOREGISTER_QUERY)[0][1])
+
+    def test_reuse_closed_connection(self):
+        """
+        A request on a connection that the server closed after the previous response is sent
+        again on a new connection.
+        """
+        responses = self.get_all(GEOREGISTER_QUERY + CLOSE_SUFFIX, GEOREGISTER_QUERY)
+        self.assertEqual([status for status, _ in responses], [200, 200])
+        self.assertEqual(len(self.server.connections), 2)
+
+    def test_truncated(self):
+        """
+        A response that ends before its Content-Length is reached fails with a ConnectionError,
+        like a connection that fails in another way.
+        """
+        with self.assertRaises(ConnectionError):
+            self.get_all("/truncated")
+
+
+if __name__ == "__main__":
+    unittest.main()
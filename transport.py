@@ -0,0 +1,469 @@
+"""
+File containing the transport that sends the HTTP requests of the validation. The transport can be
+replaced, to record the responses in a cassette file and to replay them later without a network,
+optionally with an injected latency.
+
+A cassette contains one JSON line per response, with the URL of the request (without the API key),
+the status code, the body and the number of seconds that the response took.
+"""
+
+import json
+import re
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urljoin, urlsplit, urlunsplit
+
+from report import run_report
+from util import lazy_import
+
+# The network modules are only imported when the first request is sent
+asyncio = lazy_import("asyncio")
+request = lazy_import("urllib.request")
+ssl = lazy_import("ssl")
+
+# The number of seconds after which an asynchronous request is cancelled
+TIMEOUT = 5
+# The redirects that asynchronous requests follow, like urllib does
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+# The API key in a request, which is never written to a cassette
+API_KEY_PARAMETER = re.compile(r"&key=[^&]*")
+
+
+def redact(url: str) -> str:
+    """
+    Removes the API key from the URL of a request, so that it can be stored in a cassette.
+
+    Parameters
+    ----------
+    url: str
+        The URL of the request
+
+    Returns
+    -------
+    str:
+        The URL without the API key
+    """
+    return API_KEY_PARAMETER.sub("", url)
+
+
+class MissingRecordingError(URLError):
+    """
+    Raised when a request is replayed that is not in the cassette, like a request that fails
+    because there is no network.
+    """
+
+
+class AsyncHttpClient:
+    """
+    A minimal asynchronous HTTP/1.1 client for GET requests. Connections are kept open and reused,
+    and the number of simultaneous requests is limited by a semaphore. Redirects are followed like
+    urllib does. Requests that have to go through a proxy (see urllib.request.getproxies) are sent
+    with urllib on a worker thread instead, so proxies are used in the same way as by the blocking
+    requests.
+    """
+
+    def __init__(self, max_connections: int):
+        self.semaphore = asyncio.Semaphore(max_connections)
+        self._idle = {}
+        self._ssl = ssl.create_default_context()
+        self._proxies = request.getproxies()
+        self._proxied = {}
+
+    async def get(self, url: str, timeout: float = TIMEOUT) -> (int, bytes):
+        """
+        Sends a GET request and waits for the response.
+
+        Parameters
+        ----------
+        url: str
+            The URL of the request
+        timeout: float
+            The number of seconds after which the request is cancelled
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If no response was received in time
+        OSError
+            If the connection failed
+
+        Returns
+        -------
+        (int, bytes)
+            A tuple containing the status code and the body of the response
+        """
+        async with self.semaphore:
+            start, status = time.perf_counter(), None
+            try:
+                status, body = await asyncio.wait_for(self._get(url), timeout)
+            finally:
+                run_report.request(url, time.perf_counter() - start, status != 200)
+            return status, body
+
+    async def _get(self, url: str) -> (int, bytes):
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if self._uses_proxy(parts.scheme, parts.hostname):
+                return await asyncio.get_running_loop().run_in_executor(None, self._get_with_urllib, url)
+            status, headers, body = await self._get_direct(parts)
+            if status not in REDIRECT_STATUSES or "location" not in headers:
+                break
+            url = urljoin(url, headers["location"])
+        return status, body
+
+    def _uses_proxy(self, scheme: str, hostname: str) -> bool:
+        if scheme not in self._proxies:
+            return False
+        if hostname not in self._proxied:
+            self._proxied[hostname] = not request.proxy_bypass(hostname)
+        return self._proxied[hostname]
+
+    @staticmethod
+    def _get_with_urllib(url: str) -> (int, bytes):
+        parts = urlsplit(url)
+        url = urlunsplit(parts._replace(path=quote(parts.path, safe="/%"),
+                                        query=quote(parts.query, safe="/?&=:+,;%'")))
+        try:
+            with request.urlopen(url, timeout=TIMEOUT) as response:
+                return response.status, response.read()
+        except HTTPError as exc:
+            return exc.code, exc.read() if exc.fp is not None else b""
+
+    async def _get_direct(self, parts) -> (int, dict, bytes):
+        host = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = quote(parts.path + (f"?{parts.query}" if parts.query else ""), safe="/?&=:+,;%'")
+        idle = self._idle.setdefault(host, [])
+
+        # Reuse an open connection if possible. The server may have closed it in the meantime
+        while idle:
+            reader, writer = idle.pop()
+            try:
+                return await self._request(host, reader, writer, path)
+            except ConnectionError:
+                writer.close()
+
+        reader, writer = await asyncio.open_connection(host[1], host[2],
+                                                       ssl=self._ssl if host[0] == "https" else None)
+        return await self._request(host, reader, writer, path)
+
+    async def _request(self, host, reader, writer, path) -> (int, dict, bytes):
+        try:
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host[1]}\r\nAccept-Encoding: identity\r\n"
+                         f"Connection: keep-alive\r\n\r\n".encode("ascii"))
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError("Connection closed by server")
+            status = int(status_line.split()[1])
+            headers = {}
+            line = await reader.readline()
+            while line not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+                line = await reader.readline()
+
+            keep_alive = headers.get("connection", "").lower() != "close"
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                body = b""
+                size = int((await reader.readline()).split(b";")[0], 16)
+                while size > 0:
+                    body += await reader.readexactly(size)
+                    await reader.readexactly(2)
+                    size = int((await reader.readline()).split(b";")[0], 16)
+                # Skip the (empty) trailer
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+            elif "content-length" in headers:
+                body = await reader.readexactly(int(headers["content-length"]))
+            else:
+                body = await reader.read()
+                keep_alive = False
+        except asyncio.IncompleteReadError as exc:
+            writer.close()
+            raise ConnectionError("Connection closed by server before the response was complete") from exc
+        except BaseException:
+            writer.close()
+            raise
+
+        if keep_alive:
+            self._idle[host].append((reader, writer))
+        else:
+            writer.close()
+        return status, headers, body
+
+    async def close(self):
+        """
+        Closes all open connections.
+        """
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+class LiveTransport:
+    """
+    Sends requests over the network, using urllib for blocking requests and AsyncHttpClient for
+    asynchronous requests.
+    """
+
+    def get(self, url: str, timeout: float = None) -> bytes:
+        """
+        Sends a GET request and returns the body of the response.
+
+        Parameters
+        ----------
+        url: str
+            The URL of the request
+        timeout: float
+            The number of seconds after which the request fails, or None to wait indefinitely
+
+        Raises
+        ------
+        HTTPError
+            If the server responded with an error status code
+        URLError
+            If the request could not be sent
+
+        Returns
+        -------
+        bytes:
+            The body of the response
+        """
+        with request.urlopen(url, **({} if timeout is None else {"timeout": timeout})) as response:
+            return response.read()
+
+    def async_client(self, max_connections: int) -> AsyncHttpClient:
+        """
+        Creates a client for asynchronous requests, which has to be created inside the event loop
+        that it is used in.
+
+        Parameters
+        ----------
+        max_connections: int
+            The maximum number of simultaneous requests
+
+        Returns
+        -------
+        AsyncHttpClient
+            The client
+        """
+        return AsyncHttpClient(max_connections)
+
+
+class RecordingTransport:
+    """
+    Sends requests with another transport and appends every response to a cassette.
+    """
+
+    def __init__(self, cassette: str, transport=None):
+        self.cassette = cassette
+        self.transport = transport if transport is not None else LiveTransport()
+        self._lock = threading.Lock()
+
+    def record(self, url: str, status: int, body: bytes, elapsed: float):
+        """
+        Appends a response to the cassette.
+
+        Parameters
+        ----------
+        url: str
+            The URL of the request
+        status: int
+            The status code of the response
+        body: bytes
+            The body of the response
+        elapsed: float
+            The number of seconds that the response took
+        """
+        line = json.dumps({"url": redact(url), "status": status, "body": body.decode("utf8", "surrogateescape"),
+                           "elapsed": round(elapsed, 4)})
+        with self._lock, open(self.cassette, "a", encoding="utf8") as file:
+            file.write(line + "\n")
+
+    def get(self, url: str, timeout: float = None) -> bytes:
+        """
+        Sends a GET request and records the response, see LiveTransport.get.
+        """
+        start = time.perf_counter()
+        try:
+            body = self.transport.get(url, timeout)
+        except HTTPError as exc:
+            self.record(url, exc.code, exc.read() if exc.fp is not None else b"", time.perf_counter() - start)
+            raise
+        self.record(url, 200, body, time.perf_counter() - start)
+        return body
+
+    def async_client(self, max_connections: int):
+        """
+        Creates a client for asynchronous requests that records the responses, see
+        LiveTransport.async_client.
+        """
+        return RecordingClient(self, self.transport.async_client(max_connections))
+
+
+class RecordingClient:
+    """
+    A client for asynchronous requests that records every response of another client.
+    """
+
+    def __init__(self, recorder: RecordingTransport, client):
+        self.recorder = recorder
+        self.client = client
+
+    async def get(self, url: str, timeout: float = TIMEOUT) -> (int, bytes):
+        """
+        Sends a GET request and records the response, see AsyncHttpClient.get.
+        """
+        start = time.perf_counter()
+        status, body = await self.client.get(url, timeout)
+        self.recorder.record(url, status, body, time.perf_counter() - start)
+        return status, body
+
+    async def close(self):
+        """
+        Closes all open connections.
+        """
+        await self.client.close()
+
+
+class ReplayTransport:
+    """
+    Answers requests with the responses in a cassette, without using the network. Every response
+    takes as long as it took when it was recorded, or a fixed number of seconds.
+    """
+
+    def __init__(self, cassette: str, latency: float = None):
+        self.latency = latency
+        self.responses = {}
+        with open(cassette, encoding="utf8") as file:
+            for line in file:
+                record = json.loads(line)
+                self.responses[record["url"]] = (record["status"], record["body"].encode("utf8", "surrogateescape"),
+                                                 record["elapsed"])
+
+    def response(self, url: str) -> (int, bytes, float):
+        """
+        Looks up the recorded response to a request.
+
+        Parameters
+        ----------
+        url: str
+            The URL of the request
+
+        Raises
+        ------
+        MissingRecordingError
+            If the request is not in the cassette
+
+        Returns
+        -------
+        (int, bytes, float)
+            A tuple containing the status code, the body and the latency of the response
+        """
+        try:
+            status, body, elapsed = self.responses[redact(url)]
+        except KeyError as exc:
+            raise MissingRecordingError(f"No recorded response to {redact(url)}") from exc
+        return status, body, elapsed if self.latency is None else self.latency
+
+    def get(self, url: str, timeout: float = None) -> bytes:
+        """
+        Replays the response to a GET request, see LiveTransport.get. A response that takes longer
+        than the timeout fails like it would have over the network.
+        """
+        status, body, latency = self.response(url)
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Replayed request to {redact(url)} timed out")
+        time.sleep(latency)
+        if status != 200:
+            raise HTTPError(redact(url), status, "Replayed error response", None, None)
+        return body
+
+    def async_client(self, max_connections: int):
+        """
+        Creates a client that replays asynchronous requests, see LiveTransport.async_client.
+        """
+        return ReplayClient(self, max_connections)
+
+
+class ReplayClient:
+    """
+    A client that replays asynchronous requests, with the same limit on the number of simultaneous
+    requests as AsyncHttpClient.
+    """
+
+    def __init__(self, transport: ReplayTransport, max_connections: int):
+        self.transport = transport
+        self.semaphore = asyncio.Semaphore(max_connections)
+
+    async def get(self, url: str, timeout: float = TIMEOUT) -> (int, bytes):
+        """
+        Replays the response to a GET request, see AsyncHttpClient.get.
+        """
+        status, body, latency = self.transport.response(url)
+        async with self.semaphore:
+            await asyncio.sleep(min(latency, timeout))
+        run_report.request(url, min(latency, timeout), status != 200 or latency > timeout)
+        if latency > timeout:
+            raise asyncio.TimeoutError()
+        return status, body
+
+    async def close(self):
+        """
+        Does nothing, because no connections are opened.
+        """
+
+
+class Network:
+    """
+    The transport that all requests of the validation are sent with, which can be replaced. Every
+    request is added to the run report; asynchronous requests are added by their client, so that
+    the time that they wait for a free connection does not count.
+    """
+
+    def __init__(self):
+        self.transport = LiveTransport()
+
+    def use(self, transport):
+        """
+        Replaces the transport.
+
+        Parameters
+        ----------
+        transport
+            The new transport, for example a RecordingTransport or a ReplayTransport
+
+        Returns
+        -------
+        object
+            The previous transport
+        """
+        previous, self.transport = self.transport, transport
+        return previous
+
+    def get(self, url: str, timeout: float = None) -> bytes:
+        """
+        Sends a GET request with the current transport, see LiveTransport.get.
+        """
+        start, failed = time.perf_counter(), True
+        try:
+            body = self.transport.get(url, timeout)
+            failed = False
+        finally:
+            run_report.request(url, time.perf_counter() - start, failed)
+        return body
+
+    def async_client(self, max_connections: int):
+        """
+        Creates a client for asynchronous requests with the current transport, see
+        LiveTransport.async_client.
+        """
+        return self.transport.async_client(max_connections)
+
+
+network = Network()
@@ -2,7 +2,10 @@
 File with utility functions
 """
 
+import importlib.util
+import os
 import re
+import sys
 
 dutch_address_regex = re.compile(r"^(\d*[\wäöüß\d '/\\.\-]+)[,\s]+(\d+)[\s,]*([\wäöüß\d\-/]*)$")
 
@@ -115,3 +118,95 @@ def format_dutch_postal_code(postal_code: str) -> str:
     if len(postal_code) == 6:
         return f"{postal_code[0:4]} {postal_code[4:6]}"
     return postal_code
+
+
+def resource_path(relative_path: str) -> str:
+    """
+    Returns the path of a resource file, which is bundled with the executable in frozen builds and
+    stored next to the source files otherwise, so it does not depend on the working directory.
+
+    Parameters
+    ----------
+    relative_path: str
+        The path of the resource, relative to the root of the application
+
+    Returns
+    -------
+    str:
+        The path where the resource can be found
+    """
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, relative_path)
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), relative_path)
+
+
+def lazy_import(name: str):
+    """
+    Imports a module the first time one of its attributes is used, instead of right away. Heavy
+    modules are imported this way, so that the application starts without waiting for them.
+    Note that PyInstaller does not see these imports, so the modules are listed as hidden imports
+    in the pyinstall workflow.
+
+    Parameters
+    ----------
+    name: str
+        The full name of the module
+
+    Returns
+    -------
+    module
+        The module, which is only loaded when it is used
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    # Like a regular import, make a submodule available as an attribute of its package
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+class InputFiles:
+    """
+    The files that belong with the input, such as the credentials, the caches, the BAG index and
+    the review rules. They are stored in the directory containing the input CSV files.
+    """
+
+    def __init__(self, directory: str = "input"):
+        self.directory = directory
+
+    def use(self, directory: str):
+        """
+        Changes the input directory. This should happen before any of its files are used.
+
+        Parameters
+        ----------
+        directory: str
+            The path of the input directory
+        """
+        self.directory = directory
+
+    def path(self, name: str) -> str:
+        """
+        Returns the path of a file in the input directory.
+
+        Parameters
+        ----------
+        name: str
+            The name of the file
+
+        Returns
+        -------
+        str:
+            The path of the file
+        """
+        return os.path.join(self.directory, name)
+
+
+input_files = InputFiles()